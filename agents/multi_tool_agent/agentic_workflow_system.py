@@ -3,50 +3,89 @@ Agentic Workflow System for Course Preparation, Planning, and Assessment Generat
 Implements the agent types and orchestration patterns defined in agents.txt
 """
 
-import json
-from typing import List, Dict, Any, Optional, Tuple, Union
+import asyncio
+import atexit
+import functools
+import hashlib
+import itertools
+import logging
+import math
+import re
+import threading
+from typing import List, Dict, Any, Mapping, Optional, Tuple, Union
+from types import MappingProxyType
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
-from dataclasses import dataclass, field, asdict
-from .logger import log_agent_call, log_agent_response, log_error, log_tool_call, log_tool_response
+from dataclasses import dataclass, field
+from .logger import logger, log_agent_call, log_agent_response, log_error, log_tool_call, log_tool_response
 
 from google.adk.agents import Agent, LlmAgent, SequentialAgent, LoopAgent
 from google.adk.sessions import InMemorySessionService, BaseSessionService, Session
 from google.adk.memory import InMemoryMemoryService, BaseMemoryService
 from google.adk.events import Event, EventActions
+from google.adk.tools import FunctionTool
 from google.adk.sessions import BaseSessionService as SessionService
 from google.adk.memory import BaseMemoryService as MemoryService
 from google.genai.types import Content, Part
 from .models import Course, TaskDocument, UserInteractionState, UserProfile # Import UserProfile
+from .semantic_cache import SemanticCache, semantic_cache
+from . import fast_json
 import time
 
+try:
+    from sample_platfor.lib.db.supabase_service import getCourseById
+except ImportError:
+    getCourseById = None
+
 # ------------------------------------------------------------------------
 # Constants
 # ------------------------------------------------------------------------
 
 APP_NAME = "pedagogical_system"
 
+# Bloom's taxonomy levels, in ascending order of cognitive complexity
+BLOOM_LEVEL_ORDER = ("Remembering", "Understanding", "Application", "Analysis", "Evaluation", "Creation")
+LEVELS = frozenset(BLOOM_LEVEL_ORDER)
+
+# Default activities for each planned module (shared, never mutated)
+ACTIVITIES_TUPLE = ("Lecture", "Discussion", "Group work")
+
 # ------------------------------------------------------------------------
 # Message Types for A2A Protocol
 # ------------------------------------------------------------------------
 
-class MessageType(Enum):
+class MessageType(str, Enum):
+    __str__ = str.__str__
+
     PROPOSAL = "proposal"
     APPROVAL = "approval"
     REVISION_REQUEST = "revision_request"
 
-@dataclass
+_EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+
+@dataclass(slots=True, frozen=True)
 class AgentMessage:
     message_type: MessageType
     content: Dict[str, Any]
     sender_id: str
     recipient_id: str
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    # None means "no metadata" so unused metadata doesn't allocate a dict per message
+    metadata: Optional[Mapping[str, Any]] = None
+
+    @property
+    def meta(self) -> Mapping[str, Any]:
+        """Metadata as a read-only mapping, empty when none was provided."""
+        return self.metadata if self.metadata is not None else _EMPTY_METADATA
 
 # ------------------------------------------------------------------------
 # Session State Management
 # ------------------------------------------------------------------------
 
-class SessionState(Enum):
+# Members are plain strings, usable directly as session state values and in JSON
+class SessionState(str, Enum):
+    __str__ = str.__str__
+
     # Phase 1 States
     OBJECTIVES_CAPTURED = "objectives_captured"
     STRUCTURE_PROPOSED = "structure_proposed"
@@ -67,23 +106,31 @@ class SessionState(Enum):
     COMPLETED = "completed"
     ERROR = "error"
 
+# Value -> member lookup, cheaper than SessionState(value) on the chat hot path
+_STATE_BY_VALUE = {state.value: state for state in SessionState}
+
 # ------------------------------------------------------------------------
 # Tools for Course Planning and Assessment
 # ------------------------------------------------------------------------
 
+@semantic_cache(ttl=86400, embed_arg="document")
 def extract_learning_objectives(document: str, current_course: Optional[Course] = None, user_profile: Optional[UserProfile] = None) -> Dict[str, Any]:
     """Extracts learning objectives from course materials or program descriptions, using course and user context."""
     # This would use an LLM to analyze the document for learning objectives
     # For now, we return a simple placeholder, but demonstrate access to context
     
-    print(f"Tool: extract_learning_objectives - Received document: {document[:50]}...")
-    if current_course:
-        print(f"Tool: extract_learning_objectives - Current Course Title: {current_course.title}")
-        print(f"Tool: extract_learning_objectives - Current Course Description: {current_course.description}")
-        print(f"Tool: extract_learning_objectives - Current Course Level: {current_course.level}") # Add this line
-    if user_profile:
-        print(f"Tool: extract_learning_objectives - User ID: {user_profile.userId}")
-        print(f"Tool: extract_learning_objectives - User Courses Count: {len(user_profile.courses)}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "extract_learning_objectives ctx",
+            extra={
+                "doc_prefix": document[:50],
+                "course_title": getattr(current_course, "title", None),
+                "course_description": getattr(current_course, "description", None),
+                "course_level": getattr(current_course, "level", None),
+                "user_id": getattr(user_profile, "userId", None),
+                "user_courses_count": len(user_profile.courses) if user_profile else None
+            }
+        )
 
     objectives = [
         "Understand key pedagogical concepts and theories",
@@ -110,15 +157,18 @@ def extract_learning_objectives(document: str, current_course: Optional[Course]
 def plan_course_structure(objectives: List[str], duration_weeks: int) -> Dict[str, Any]:
     """Creates a structured course outline based on learning objectives."""
     # In a real system, this would generate a more sophisticated structure
-    modules = []
-    for i in range(min(len(objectives), duration_weeks)):
-        modules.append({
+    n = min(len(objectives), duration_weeks)
+    last = duration_weeks - 1
+    modules = [
+        {
             "week": i + 1,
             "title": f"Module {i + 1}",
             "focus_objective": objectives[i],
-            "activities": ["Lecture", "Discussion", "Group work"],
-            "assessment": "Quiz" if i < duration_weeks - 1 else "Final Project"
-        })
+            "activities": ACTIVITIES_TUPLE,
+            "assessment": "Final Project" if i == last else "Quiz"
+        }
+        for i in range(n)
+    ]
     
     return {
         "status": "success",
@@ -127,26 +177,16 @@ def plan_course_structure(objectives: List[str], duration_weeks: int) -> Dict[st
 
 def check_bloom_alignment(objectives: List[Dict[str, str]]) -> Dict[str, Any]:
     """Checks if objectives cover a balanced distribution of Bloom's taxonomy levels."""
-    # Count the distribution of Bloom's levels
-    taxonomy_levels = {
-        "Remembering": 0,
-        "Understanding": 0,
-        "Application": 0, 
-        "Analysis": 0,
-        "Evaluation": 0,
-        "Creation": 0
-    }
-    
-    for obj in objectives:
-        level = obj.get("level", "")
-        if level in taxonomy_levels:
-            taxonomy_levels[level] += 1
+    # Count the distribution of Bloom's levels in a single pass
+    counts = Counter(obj.get("level") for obj in objectives)
+    covered = LEVELS & counts.keys()
     
     # Check if at least 4 levels are covered
-    levels_covered = sum(1 for count in taxonomy_levels.values() if count > 0)
+    levels_covered = len(covered)
     is_balanced = levels_covered >= 4
     
-    missing_levels = [level for level, count in taxonomy_levels.items() if count == 0]
+    taxonomy_levels = {level: counts.get(level, 0) for level in BLOOM_LEVEL_ORDER}
+    missing_levels = [level for level in BLOOM_LEVEL_ORDER if level not in covered]
     
     return {
         "status": "success",
@@ -156,6 +196,38 @@ def check_bloom_alignment(objectives: List[Dict[str, str]]) -> Dict[str, Any]:
         "levels_covered": levels_covered
     }
 
+# Type-specific assessment fields; each builder returns fresh literals, so every item
+# owns its options and consumers can mutate them without affecting other items
+def _mcq_fields() -> Dict[str, Any]:
+    return {
+        "options": [
+            {"id": "A", "text": "Option A"},
+            {"id": "B", "text": "Option B"},
+            {"id": "C", "text": "Option C"},
+            {"id": "D", "text": "Option D"}
+        ],
+        "correct_answer": "A"
+    }
+
+def _open_ended_fields() -> Dict[str, Any]:
+    return {
+        "scoring_rubric": "Criteria for evaluating responses...",
+        "example_answer": "Example of a complete answer..."
+    }
+
+def _case_study_fields() -> Dict[str, Any]:
+    return {
+        "case_text": "Description of the case scenario...",
+        "analysis_prompts": ["Prompt 1", "Prompt 2"]
+    }
+
+FIELDS_BY_TYPE = {
+    "mcq": _mcq_fields,
+    "open_ended": _open_ended_fields,
+    "case_study": _case_study_fields,
+}
+
+@semantic_cache(ttl=86400, embed_arg="objective")
 def generate_assessment_item(objective: str, bloom_level: str, question_type: str) -> Dict[str, Any]:
     """Generates an assessment item (question) aligned with an objective and Bloom's level."""
     # This would use an LLM to generate a real question
@@ -170,25 +242,15 @@ def generate_assessment_item(objective: str, bloom_level: str, question_type: st
         "type": question_type
     }
     
-    # Add type-specific fields
-    if question_type == "mcq":
-        result["options"] = [
-            {"id": "A", "text": "Option A"},
-            {"id": "B", "text": "Option B"},
-            {"id": "C", "text": "Option C"},
-            {"id": "D", "text": "Option D"}
-        ]
-        result["correct_answer"] = "A"
-    elif question_type == "open_ended":
-        result["scoring_rubric"] = "Criteria for evaluating responses..."
-        result["example_answer"] = "Example of a complete answer..."
-    elif question_type == "case_study":
-        result["case_text"] = "Description of the case scenario..."
-        result["analysis_prompts"] = ["Prompt 1", "Prompt 2"]
+    # Add type-specific fields (unknown types get none)
+    build_fields = FIELDS_BY_TYPE.get(question_type)
+    if build_fields is not None:
+        result.update(build_fields())
     
     return result
 
-def recommend_resources(topic: str, resource_types: List[str]) -> Dict[str, Any]:
+@semantic_cache(ttl=86400, embed_arg="topic")
+async def recommend_resources(topic: str, resource_types: List[str]) -> Dict[str, Any]:
     """Recommends learning resources for a given topic."""
     # This would integrate with external APIs or databases
     resources = []
@@ -206,6 +268,27 @@ def recommend_resources(topic: str, resource_types: List[str]) -> Dict[str, Any]
         "resources": resources
     }
 
+# Tool wrappers are built once at import so schema extraction (signature and docstring
+# parsing) is not repeated per agent; agents share the same wrapper objects
+ADK_TOOL_WRAPPERS = {
+    fn: FunctionTool(func=fn)
+    for fn in (
+        extract_learning_objectives,
+        check_bloom_alignment,
+        plan_course_structure,
+        generate_assessment_item,
+        recommend_resources,
+    )
+}
+
+_LEARNING_TOOLS = (ADK_TOOL_WRAPPERS[extract_learning_objectives], ADK_TOOL_WRAPPERS[check_bloom_alignment])
+_SYLLABUS_TOOLS = (ADK_TOOL_WRAPPERS[plan_course_structure],)
+_ASSESSMENT_TOOLS = (
+    ADK_TOOL_WRAPPERS[generate_assessment_item],
+    ADK_TOOL_WRAPPERS[check_bloom_alignment],
+)
+_RESOURCE_TOOLS = (ADK_TOOL_WRAPPERS[recommend_resources],)
+
 # ------------------------------------------------------------------------
 # Agents Implementation
 # ------------------------------------------------------------------------
@@ -240,7 +323,7 @@ Décrire et illustrer les composants cellulaires et leurs fonctions.
 Expliquer les mécanismes clés du métabolisme et de la division cellulaire.
 Relier les connaissances cellulaires aux phénomènes biologiques observables chez les organismes vivants.
 Interpréter des données expérimentales simples liées à la biologie cellulaire.""",
-    tools=[extract_learning_objectives, check_bloom_alignment] # The tool itself is passed
+    tools=list(_LEARNING_TOOLS)
 )
 
 # LLM Agent - Syllabus Planner Agent
@@ -274,7 +357,7 @@ Décrire et illustrer les composants cellulaires et leurs fonctions.
 Expliquer les mécanismes clés du métabolisme et de la division cellulaire.
 Relier les connaissances cellulaires aux phénomènes biologiques observables chez les organismes vivants.
 Interpréter des données expérimentales simples liées à la biologie cellulaire.""",
-    tools=[plan_course_structure]
+    tools=list(_SYLLABUS_TOOLS)
 )
 
 # LLM Agent - Assessment Generator Agent
@@ -308,7 +391,7 @@ Décrire et illustrer les composants cellulaires et leurs fonctions.
 Expliquer les mécanismes clés du métabolisme et de la division cellulaire.
 Relier les connaissances cellulaires aux phénomènes biologiques observables chez les organismes vivants.
 Interpréter des données expérimentales simples liées à la biologie cellulaire.""",
-    tools=[generate_assessment_item, check_bloom_alignment]
+    tools=list(_ASSESSMENT_TOOLS)
 )
 
 
@@ -383,21 +466,15 @@ Décrire et illustrer les composants cellulaires et leurs fonctions.
 Expliquer les mécanismes clés du métabolisme et de la division cellulaire.
 Relier les connaissances cellulaires aux phénomènes biologiques observables chez les organismes vivants.
 Interpréter des données expérimentales simples liées à la biologie cellulaire.""",
-    tools=[recommend_resources]
+    tools=list(_RESOURCE_TOOLS)
 )
 
 # ------------------------------------------------------------------------
 # Enhanced Root Orchestrator Agent with Context Access
 # ------------------------------------------------------------------------
 
-def create_root_agent_with_context(consolidated_context: str = "") -> Agent:
-    """
-    Create the root agent with enhanced access to user context and session state,
-    including consolidated context appended to the instruction.
-    """
-    
-    # Base instruction for the root agent
-    base_instruction = """
+# Base instruction for the root agent
+_ROOT_BASE_INSTRUCTION = """
     Vous êtes l'orchestrateur principal pour la planification de cours et le développement d'évaluations, spécialisé dans le cours de Biologie cellulaire (niveau CEGEP).
 
     Votre tâche est de :
@@ -406,6 +483,8 @@ def create_root_agent_with_context(consolidated_context: str = "") -> Agent:
     3. Assurer la cohérence pédagogique entre les objectifs, le contenu et les évaluations.
     4. Interagir avec les agents spécialisés (planification, évaluation, ressources) selon la demande de l'utilisateur.
 
+    Chaque requête fournit le contexte récent de la conversation dans l'entrée « context » et la demande de l'utilisateur dans l'entrée « message ».
+
 Résumé du cours : Biologie cellulaire (niveau CEGEP)
 Ce cours de biologie offre une introduction approfondie à la structure, la fonction et les processus fondamentaux des cellules, unité de base du vivant. Il s'adresse aux étudiants de niveau collégial souhaitant acquérir une compréhension solide des principes cellulaires en vue de futures études en sciences de la santé, biotechnologie ou sciences pures.
 
@@ -423,20 +502,32 @@ Décrire et illustrer les composants cellulaires et leurs fonctions.
 Expliquer les mécanismes clés du métabolisme et de la division cellulaire.
 Relier les connaissances cellulaires aux phénomènes biologiques observables chez les organismes vivants.
 Interpréter des données expérimentales simples liées à la biologie cellulaire."""
+
+_CONTEXT_HEADER = "\n\n--- CONSOLIDATED CONTEXT ---\n"
+
+def create_root_agent_with_context(consolidated_context: str = "") -> Agent:
+    """
+    Create the root agent with enhanced access to user context and session state,
+    including consolidated context appended to the instruction.
+    """
     
     # Append consolidated context to the instruction if provided
-    full_instruction = f"{base_instruction}\n\n--- CONSOLIDATED CONTEXT ---\n{consolidated_context}" if consolidated_context else base_instruction
+    full_instruction = "".join((_ROOT_BASE_INSTRUCTION, _CONTEXT_HEADER, consolidated_context)) if consolidated_context else _ROOT_BASE_INSTRUCTION
     
+    # Agents with identical context share one instance
+    return _build_root_agent(full_instruction)
+
+@functools.lru_cache(maxsize=128)
+def _build_root_agent(full_instruction: str) -> Agent:
+    """Build the enhanced root agent for a given instruction; cached per instruction."""
     # Enhanced root agent with context tools (tools are removed as context is in instruction)
-    enhanced_root_agent = Agent(
+    return Agent(
         name="pedagogical_orchestrator_enhanced",
         model="gemini-2.0-flash-exp",
         description="Enhanced orchestrator with full access to user context and session state.",
         instruction=full_instruction,
         tools=[] # Tools for getting context are no longer needed
     )
-    
-    return enhanced_root_agent
 
 # Import the root agent from agent.py which has the session context tool
 from .agent import root_agent
@@ -445,10 +536,106 @@ from .agent import root_agent
 # Enhanced Session and Memory Services with ADK Best Practices
 # ------------------------------------------------------------------------
 
+# Maximum events kept on a live session; older ones are archived to the memory service
+MAX_SESSION_EVENTS = 1024
+# Evict in chunks so that trimming is not paid on every append once a session is full
+SESSION_EVENT_TRIM_SLACK = 128
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """
+    InMemorySessionService with a bounded per-session event history.
+
+    State deltas are already folded into session.state when an event is appended, so
+    the oldest events can be dropped without losing state; they are handed to the
+    memory service for long-term retrieval instead of growing the session forever.
+    """
+
+    def __init__(self, max_events: int = MAX_SESSION_EVENTS, trim_slack: int = SESSION_EVENT_TRIM_SLACK):
+        super().__init__()
+        self.max_events = max_events
+        self.trim_slack = trim_slack
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        event = super().append_event(session, event)
+        # The service keeps its own copy of each session; evicted events are archived once,
+        # from the stored copy, and the caller's copy is only truncated to match
+        stored = self.sessions.get(session.app_name, {}).get(session.user_id, {}).get(session.id)
+        owner = stored if stored is not None else session
+        evicted = self._trim_events(owner)
+        if owner is not session:
+            self._trim_events(session)
+        if evicted:
+            _archive_session_events(owner, evicted)
+        return event
+
+    def _trim_events(self, session: Session) -> List[Event]:
+        """Drop the oldest events once the history is past max_events plus the slack; returns them."""
+        overflow = len(session.events) - self.max_events
+        if overflow <= self.trim_slack:
+            return []
+        evicted = session.events[:overflow]
+        del session.events[:overflow]
+        return evicted
+
+def _archive_session_events(session: Session, events: List[Event]) -> None:
+    """Snapshot events evicted from a live session into the memory service."""
+    try:
+        _write_memory_entries([{
+            "user_id": session.user_id,
+            "content": f"Archived {len(events)} events from session {session.id}",
+            "metadata": {
+                "type": "session_events",
+                "session_id": session.id,
+                "events": [
+                    {"invocation_id": e.invocation_id, "author": e.author, "timestamp": e.timestamp,
+                     "state_delta": e.actions.state_delta if e.actions else None}
+                    for e in events
+                ]
+            }
+        }])
+    except Exception as e:
+        log_error("_archive_session_events", e, session.id)
+
 # Initialize services for development
-session_service = InMemorySessionService()
+session_service = BoundedInMemorySessionService()
 memory_service = InMemoryMemoryService()
 
+# One process-wide counter for update invocation ids: unique and increasing within every
+# session, independent of event history length, and no per-session entry to clean up
+_invocation_ids = itertools.count(1)
+
+# InMemorySessionService keeps Python objects as-is, so structured state values are
+# stored directly; string serialization is only needed for persistent backends.
+_STATE_NEEDS_SERIALIZATION = not isinstance(session_service, InMemorySessionService)
+# In-memory sessions accept their initial state directly; other backends keep an init event
+_STATE_FROM_EVENT_LOG = not isinstance(session_service, InMemorySessionService)
+
+def _to_state_value(value: Any) -> Any:
+    """Prepare a structured value for session state, serializing only when the backend requires it."""
+    return fast_json.dumps(value) if _STATE_NEEDS_SERIALIZATION else value
+
+def _from_state_value(value: Any, default: Any) -> Any:
+    """Read a structured value from session state, accepting both raw and serialized forms."""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return fast_json.loads(value) if value else default
+    return value
+
+@functools.lru_cache(maxsize=16)
+def _parse_supported_languages(raw: str) -> Tuple[str, ...]:
+    """Decode a serialized language list; the same few strings recur across sessions."""
+    try:
+        return tuple(fast_json.loads(raw)) if raw else ()
+    except ValueError:
+        return ()
+
+def _get_supported_languages(value: Any) -> List[str]:
+    """Supported languages from session state, stored raw or serialized."""
+    if isinstance(value, str):
+        return list(_parse_supported_languages(value))
+    return list(value) if value else []
+
 def initialize_session_with_user_context(
     user_id: str, 
     user_profile: Optional[UserProfile] = None,
@@ -458,18 +645,10 @@ def initialize_session_with_user_context(
     Initialize a new session with proper ADK state management.
     Uses ADK's session.state with proper prefixes for different scopes.
     """
-    # Create session using ADK SessionService
-    session = session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-        state={}
-    )
-    session_id = session.id
-    
     # Initialize state using ADK patterns with proper prefixes
     initial_state_delta = {
         # Session-specific state (no prefix)
-        "current_step": SessionState.OBJECTIVES_CAPTURED.value,
+        "current_step": SessionState.OBJECTIVES_CAPTURED,
         "chat_context": {},
         "current_task_id": None,
         
@@ -477,30 +656,42 @@ def initialize_session_with_user_context(
         "user:profile_id": user_profile.userId if user_profile else None,
         "user:name": user_profile.name if user_profile else None,
         "user:email": user_profile.email if user_profile else None,
-        "user:preferences": json.dumps(user_profile.preferences) if user_profile and user_profile.preferences else "{}",
+        "user:preferences": _to_state_value(user_profile.preferences if user_profile and user_profile.preferences else {}),
         
         # Current course state (session-specific but could be user: if needed across sessions)
         "current_course_id": current_course.id if current_course else None,
         "current_course_title": current_course.title if current_course else None,
         "current_course_description": current_course.description if current_course else None,
         "current_course_level": current_course.level if current_course else None,
-        "current_course_pedagogical_info": json.dumps(current_course.summarized_pedagogical_info) if current_course and current_course.summarized_pedagogical_info else "{}",
+        "current_course_pedagogical_info": _to_state_value(current_course.summarized_pedagogical_info if current_course and current_course.summarized_pedagogical_info else {}),
         
         # App-level state (shared across all users)
         "app:version": "1.0.0",
-        "app:supported_languages": json.dumps(["en", "fr"])
+        "app:supported_languages": _to_state_value(["en", "fr"])
     }
     
-    # Create event to initialize the session state
-    initialization_event = Event(
-        invocation_id=f"init_{session_id}",
-        author="system",
-        actions=EventActions(state_delta=initial_state_delta),
-        timestamp=time.time()
-    )
-    
-    # Apply initial state using proper ADK event pattern
-    session_service.append_event(session, initialization_event)
+    # Create the session with its initial state in one call; backends that derive
+    # state from the event log (audit) still get an explicit initialization event
+    if _STATE_FROM_EVENT_LOG:
+        session = session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            state={}
+        )
+        initialization_event = Event(
+            invocation_id=f"init_{session.id}",
+            author="system",
+            actions=EventActions(state_delta=initial_state_delta),
+            timestamp=time.time()
+        )
+        session_service.append_event(session, initialization_event)
+    else:
+        session = session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            state=initial_state_delta
+        )
+    session_id = session.id
     
     # Add user profile and course to memory for long-term retrieval
     if user_profile:
@@ -518,6 +709,9 @@ def initialize_session_with_user_context(
     
     return session_id
 
+# State keys the consolidated context is built from (besides "chat_context")
+_CONTEXT_INPUT_PREFIXES = ("current_course_", "user:")
+
 def update_session_state_adk(
     session_id: str, 
     state_updates: Dict[str, Any],
@@ -536,9 +730,16 @@ def update_session_state_adk(
     if not session:
         raise ValueError(f"Session {session_id} not found")
     
+    # Invalidate the cached consolidated context when any of its inputs change
+    if any(key.startswith(_CONTEXT_INPUT_PREFIXES) or key == "chat_context" for key in state_updates):
+        state_updates = {
+            **state_updates,
+            "consolidated_context_version": session.state.get("consolidated_context_version", 0) + 1
+        }
+    
     # Create event with state delta
     update_event = Event(
-        invocation_id=f"update_{session_id}_{len(session.events)}",
+        invocation_id=f"update_{session_id}_{next(_invocation_ids)}",
         author=event_author,
         actions=EventActions(state_delta=state_updates),
         timestamp=time.time()
@@ -552,10 +753,63 @@ def update_session_state_adk(
         "updates": list(state_updates.keys())
     }, session_id)
 
-def get_user_context_from_session(session_id: str) -> Dict[str, Any]:
+# Course details fetched from the database, shared process-wide; the short TTL lets course edits propagate
+COURSE_CACHE_TTL = 60
+_course_cache = SemanticCache(ttl=COURSE_CACHE_TTL, maxsize=512)
+
+# Assembled context strings, kept in-process (never in session state) so reading the
+# context does not append events; one entry per session, tagged with the state version
+# and the course details the strings were built from
+CONTEXT_STRINGS_CACHE_SIZE = 1024
+_context_strings_cache: "OrderedDict[str, Tuple[int, Optional[Dict[str, Any]], str, str, str]]" = OrderedDict()
+_context_strings_lock = threading.Lock()
+
+def _get_course_cached(course_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch detailed course info by id, serving repeat lookups from a TTL cache."""
+    hit, data = _course_cache.get((course_id,))
+    if hit:
+        return data
+    if getCourseById is None:
+        raise ImportError("sample_platfor.lib.db.supabase_service is not available")
+    db_result = getCourseById(course_id)
+    data = db_result.data if db_result and db_result.data else None
+    if data:
+        _course_cache.set((course_id,), data)
+    return data
+
+def _assemble_user_context(
+    state: Dict[str, Any],
+    app_fields: Dict[str, Any],
+    user_profile: Optional[UserProfile],
+    current_course: Optional[Course],
+    course_details: Optional[Dict[str, Any]],
+    consolidated_context: str,
+    course_context: str,
+    memory_context: str
+) -> Dict[str, Any]:
+    return {
+        "user_profile": user_profile,
+        "current_course": current_course,
+        "current_step": state.get("current_step"),
+        "chat_context": state.get("chat_context", {}),
+        "current_task_id": state.get("current_task_id"),
+        "app_version": app_fields.get("version"),
+        "supported_languages": _get_supported_languages(app_fields.get("supported_languages")),
+        "course_details": course_details,
+        "consolidated_context": consolidated_context,  # New consolidated context string
+        "course_context": course_context,
+        "memory_context": memory_context
+    }
+
+def get_user_context_from_session(
+    session_id: str,
+    prefetched_course_details: Optional[Dict[str, Any]] = None,
+    skip_db_fetch: bool = False
+) -> Dict[str, Any]:
     """
     Retrieve user profile and course context from session state.
     Returns structured context for agent consumption with consolidated context string.
+    Already-fetched course details can be passed in to avoid another database round-trip.
     """
     session = session_service.get_session(
         app_name=APP_NAME,
@@ -568,34 +822,45 @@ def get_user_context_from_session(session_id: str) -> Dict[str, Any]:
     
     state = session.state
     
+    # Split the scoped keys out of the state in a single pass
+    user_fields, course_fields, app_fields = {}, {}, {}
+    for key, value in state.items():
+        if key.startswith("user:"):
+            user_fields[key[5:]] = value
+        elif key.startswith("current_course_"):
+            course_fields[key[15:]] = value
+        elif key.startswith("app:"):
+            app_fields[key[4:]] = value
+    
     user_profile_data = {
-        "userId": state.get("user:profile_id"),
-        "name": state.get("user:name"),
-        "email": state.get("user:email"),
-        "preferences": json.loads(state.get("user:preferences", "{}"))
+        "userId": user_fields.get("profile_id"),
+        "name": user_fields.get("name"),
+        "email": user_fields.get("email"),
+        "preferences": _from_state_value(user_fields.get("preferences"), {})
     }
     user_profile = UserProfile(**user_profile_data) if user_profile_data["userId"] else None
 
     # Get course details from session state
     current_course_data = {
-        "id": state.get("current_course_id"),
-        "title": state.get("current_course_title"),
-        "description": state.get("current_course_description"),
-        "level": state.get("current_course_level"),
+        "id": course_fields.get("id"),
+        "title": course_fields.get("title"),
+        "description": course_fields.get("description"),
+        "level": course_fields.get("level"),
     }
     current_course = Course(**current_course_data) if current_course_data["id"] else None
 
     # Fetch detailed course information from the database if a course ID is present
     detailed_course_info = None
-    course_id = state.get("current_course_id")
-    if course_id:
+    course_details_complete = True
+    course_id = current_course_data["id"]
+    if course_id and prefetched_course_details is not None:
+        detailed_course_info = prefetched_course_details
+    elif course_id and skip_db_fetch:
+        course_details_complete = False
+    elif course_id:
         try:
-            # Import the getCourseById function
-            from sample_platfor.lib.db.supabase_service import getCourseById
-            
-            db_result = getCourseById(course_id)
-            if db_result and db_result.data:
-                detailed_course_info = db_result.data
+            detailed_course_info = _get_course_cached(course_id)
+            if detailed_course_info:
                 log_tool_response("getCourseById", {"status": "success", "course_id": course_id, "data_present": True}, session_id)
             else:
                  log_tool_response("getCourseById", {"status": "success", "course_id": course_id, "data_present": False, "message": "No data found"}, session_id)
@@ -603,31 +868,48 @@ def get_user_context_from_session(session_id: str) -> Dict[str, Any]:
             log_error("getCourseById", e, session_id)
             # Handle database fetch error - maybe log it and continue without detailed info
             detailed_course_info = {"error": str(e), "message": "Failed to fetch detailed course info from database."}
-
+            course_details_complete = False
+
+
+    # Reuse the strings built for this state version when the course details are unchanged
+    context_version = state.get("consolidated_context_version", 0)
+    with _context_strings_lock:
+        cached = _context_strings_cache.get(session_id)
+    if (course_details_complete and cached
+            and cached[0] == context_version and cached[1] == detailed_course_info):
+        context = _assemble_user_context(
+            state, app_fields, user_profile, current_course,
+            detailed_course_info, cached[2], cached[3], cached[4]
+        )
+        log_agent_response("get_user_context_from_session", {"session_id": session_id, "context_keys": list(context.keys()), "cached": True}, session_id)
+        return context
 
     # Extract chat context for memory
     chat_context = state.get("chat_context", {})
     most_recent_user_query = chat_context.get("last_message", "")
     agent_last_response = chat_context.get("last_response", "")
 
-    # Build consolidated context string
-    consolidated_context = _build_consolidated_context_string(
-        most_recent_user_query,
-        agent_last_response,
-        current_course,
-        detailed_course_info # Pass the fetched detailed course info
+    # Build consolidated context string; the course part is also kept on its own so the
+    # root agent instruction stays stable across turns while the conversation changes
+    memory_context = _build_memory_block(most_recent_user_query, agent_last_response)
+    course_block = _build_course_block(current_course, detailed_course_info)
+    consolidated_context = _wrap_context(memory_context + course_block)
+    course_context = _wrap_context(course_block)
+
+    context = _assemble_user_context(
+        state, app_fields, user_profile, current_course,
+        detailed_course_info, consolidated_context, course_context, memory_context
     )
 
-    context = {
-        "user_profile": user_profile,
-        "current_course": current_course,
-        "current_step": state.get("current_step"),
-        "chat_context": chat_context,
-        "current_task_id": state.get("current_task_id"),
-        "app_version": state.get("app:version"),
-        "supported_languages": json.loads(state.get("app:supported_languages", "[]")),
-        "consolidated_context": consolidated_context  # New consolidated context string
-    }
+    # Keep the built strings for this state version; partial builds (failed or skipped fetch) are not cached
+    if course_details_complete:
+        with _context_strings_lock:
+            _context_strings_cache[session_id] = (
+                context_version, detailed_course_info, consolidated_context, course_context, memory_context
+            )
+            _context_strings_cache.move_to_end(session_id)
+            if len(_context_strings_cache) > CONTEXT_STRINGS_CACHE_SIZE:
+                _context_strings_cache.popitem(last=False)
 
     log_agent_call("get_user_context_from_session", {"message": "Consolidated context built", "consolidated_context_preview": consolidated_context[:500] + "..."}, session_id) # Log consolidated context preview
 
@@ -635,6 +917,57 @@ def get_user_context_from_session(session_id: str) -> Dict[str, Any]:
     return context
 
 
+def _build_memory_block(user_query: str, agent_response: str) -> str:
+    """Conversation part of the context (last query and response); changes every turn."""
+    if not (user_query or agent_response):
+        return ""
+    query_line = f"Most Recent User Query: {user_query}\n" if user_query else ""
+    response_line = f"Agent's Last Response: {agent_response}\n" if agent_response else ""
+    return f"{query_line}{response_line}\n"
+
+def _course_context_key(current_course: Optional[Course]) -> Optional[Tuple[Any, ...]]:
+    """The Course fields shown in the context, as a hashable key."""
+    if not current_course:
+        return None
+    return (current_course.id, current_course.title, current_course.level,
+            current_course.description, current_course.session, current_course.instructor)
+
+def _render_course_block(course_key: Optional[Tuple[Any, ...]], formatted_json: Optional[str]) -> str:
+    # Add current course details
+    course_block = ""
+    if course_key:
+        course_id, title, level, description, session, instructor = course_key
+        level_line = f"Course_Level: {level}\n" if level else ""
+        description_line = f"Course_Description_Summary: {description}\n" if description else ""
+        # Add session and instructor if set (both are optional Course fields)
+        session_line = f"Course_Session: {session}\n" if session else ""
+        instructor_line = f"Course_Instructor: {instructor}\n" if instructor else ""
+        course_block = (
+            f"--- CURRENT COURSE DETAILS ---\n"
+            f"Course_ID: {course_id}\n"
+            f"Course_Name: {title}\n"
+            f"{level_line}{description_line}{session_line}{instructor_line}\n"
+        )
+    
+    # Add detailed course information (JSON)
+    json_block = f"--- DETAILED COURSE INFORMATION (JSON) ---\n{formatted_json}\n\n" if formatted_json is not None else ""
+    
+    return f"{course_block}{json_block}"
+
+@functools.lru_cache(maxsize=256)
+def _course_block_cached(course_key: Optional[Tuple[Any, ...]], formatted_json: Optional[str]) -> str:
+    """Rendered course block, cached by the course fields and details JSON so repeat turns reuse the whole string."""
+    return _render_course_block(course_key, formatted_json)
+
+def _build_course_block(current_course: Optional[Course], course_details_json: Optional[Dict[str, Any]]) -> str:
+    """Course part of the context (details and JSON); stable while the course is unchanged."""
+    course_key = _course_context_key(current_course)
+    try:
+        formatted_json = fast_json.dumps(course_details_json, pretty=True) if course_details_json else None
+    except Exception:
+        formatted_json = str(course_details_json)
+    return _course_block_cached(course_key, formatted_json)
+
 def _build_consolidated_context_string(
     user_query: str, 
     agent_response: str, 
@@ -644,91 +977,180 @@ def _build_consolidated_context_string(
     """
     Build a consolidated context string with memory and course details for agent consumption.
     """
-    context_parts = ["--- CONTEXT ---"]
-    
-    # Add memory information
-    if user_query:
-        context_parts.append(f"Most Recent User Query: {user_query}")
-    if agent_response:
-        context_parts.append(f"Agent's Last Response: {agent_response}")
-    
-    if user_query or agent_response:
-        context_parts.append("")  # Empty line for separation
-    
-    # Add current course details
-    if current_course:
-        context_parts.append("--- CURRENT COURSE DETAILS ---")
-        context_parts.append(f"Course_ID: {current_course.id}")
-        context_parts.append(f"Course_Name: {current_course.title}")
-        if current_course.level:
-            context_parts.append(f"Course_Level: {current_course.level}")
-        if current_course.description:
-            context_parts.append(f"Course_Description_Summary: {current_course.description}")
-        
-        # Add session and instructor if available from course attributes
-        if hasattr(current_course, 'session') and current_course.session:
-            context_parts.append(f"Course_Session: {current_course.session}")
-        if hasattr(current_course, 'instructor') and current_course.instructor:
-            context_parts.append(f"Course_Instructor: {current_course.instructor}")
-        
-        context_parts.append("")  # Empty line for separation
-    
-    # Add detailed course information (JSON)
-    if course_details_json:
-        context_parts.append("--- DETAILED COURSE INFORMATION (JSON) ---")
-        try:
-            formatted_json = json.dumps(course_details_json, indent=2)
-            context_parts.append(formatted_json)
-        except Exception:
-            context_parts.append(str(course_details_json))
-        context_parts.append("")  # Empty line for separation
-    
-    context_parts.append("--- END CONTEXT ---")
-    
-    return "\n".join(context_parts)
+    return _wrap_context(_build_memory_block(user_query, agent_response) + _build_course_block(current_course, course_details_json))
+
+def _wrap_context(body: str) -> str:
+    """Frame context blocks with the CONTEXT markers agents expect."""
+    return f"--- CONTEXT ---\n{body}--- END CONTEXT ---"
 
 # ------------------------------------------------------------------------
 # Enhanced Memory Service Functions
 # ------------------------------------------------------------------------
 
-def add_user_to_memory(user_id: str, user_profile: UserProfile) -> None:
-    """Add user profile to memory service for long-term retrieval."""
+def course_to_memory_payload(course: Course) -> Dict[str, Any]:
+    """Memory payload for a course built from direct attribute reads, without the recursive copy done by asdict()."""
+    return {
+        "id": course.id,
+        "title": course.title,
+        "description": course.description,
+        "level": course.level,
+        "documents": course.documents,
+        "course_details_json": course.course_details_json,
+        "session": course.session,
+        "instructor": course.instructor,
+        "summarized_pedagogical_info": course.summarized_pedagogical_info
+    }
+
+def _profile_to_dict(user_profile: UserProfile) -> Dict[str, Any]:
+    """Shallow field dict for a user profile; same shape as asdict() without copying nested values."""
+    return {
+        "userId": user_profile.userId,
+        "name": user_profile.name,
+        "email": user_profile.email,
+        "preferences": user_profile.preferences,
+        "courses": [course_to_memory_payload(course) for course in user_profile.courses] if user_profile.courses else []
+    }
+
+def _user_memory_entry(user_id: str, user_profile: UserProfile) -> Dict[str, Any]:
+    """Build the memory service payload for a user profile."""
     user_data = {
         "type": "user_profile",
         "user_id": user_id,
-        "profile": asdict(user_profile),
-        "courses": [asdict(course) for course in user_profile.courses] if user_profile.courses else []
+        "profile": _profile_to_dict(user_profile),
+        "courses": [course_to_memory_payload(course) for course in user_profile.courses] if user_profile.courses else []
+    }
+    return {
+        "user_id": user_id,
+        "content": f"User profile for {user_profile.name} ({user_profile.email}). Courses: {', '.join([c.title for c in user_profile.courses]) if user_profile.courses else 'None'}",
+        "metadata": user_data
     }
-    
-    # Add to memory with searchable content
-    memory_service.add_session_to_memory(
-        session_data={
-            "user_id": user_id,
-            "content": f"User profile for {user_profile.name} ({user_profile.email}). Courses: {', '.join([c.title for c in user_profile.courses]) if user_profile.courses else 'None'}",
-            "metadata": user_data
-        }
-    )
-    
-    log_tool_call("add_user_to_memory", {"user_id": user_id, "name": user_profile.name}, None)
 
-def add_course_to_memory(user_id: str, course: Course) -> None:
-    """Add course information to memory service."""
+def _course_memory_entry(user_id: str, course: Course) -> Dict[str, Any]:
+    """Build the memory service payload for a course."""
     course_data = {
         "type": "course",
         "user_id": user_id,
-        "course": asdict(course)
+        "course": course_to_memory_payload(course)
     }
+    return {
+        "user_id": user_id,
+        "content": f"Course: {course.title} - {course.description}. Level: {course.level}",
+        "metadata": course_data
+    }
+
+# InMemoryMemoryService has no locking of its own, and writes come from the chat path,
+# the background writer and the memory batcher's thread
+_memory_service_lock = threading.Lock()
+
+# Index keys for entries that don't replace an earlier one (archives, legacy key/value notes)
+_memory_entry_ids = itertools.count(1)
+
+def _write_memory_entries(entries: List[Dict[str, Any]], keys: Optional[List[str]] = None) -> None:
+    """
+    Submit memory payloads in one call when the memory service supports batching, and
+    index them for history search. An entry written under an existing key replaces it.
+    """
+    add_batch = getattr(memory_service, "add_session_batch", None)
+    with _memory_service_lock:
+        if add_batch is not None:
+            add_batch(entries)
+        else:
+            for entry in entries:
+                memory_service.add_session_to_memory(session_data=entry)
+    for i, entry in enumerate(entries):
+        if entry.get("user_id"):
+            key = keys[i] if keys else f"entry:{next(_memory_entry_ids)}"
+            user_history_index.add(entry["user_id"], key, entry)
+
+# Digest of the last payload written per memory entity; profiles and courses rarely
+# change mid-session, so identical payloads are not written again
+_memory_write_digests: Dict[str, bytes] = {}
+_memory_write_digests_lock = threading.Lock()
+
+def _memory_payload_digest(entry: Dict[str, Any]) -> Optional[bytes]:
+    try:
+        return hashlib.blake2b(fast_json.dumps(entry).encode(), digest_size=16).digest()
+    except (TypeError, ValueError):
+        return None  # Not serializable as-is; always write
+
+def _is_duplicate_memory_write(key: str, digest: Optional[bytes]) -> bool:
+    if digest is None:
+        return False
+    with _memory_write_digests_lock:
+        return _memory_write_digests.get(key) == digest
+
+def _record_memory_write(key: str, digest: Optional[bytes]) -> None:
+    if digest is not None:
+        with _memory_write_digests_lock:
+            _memory_write_digests[key] = digest
+
+def _write_memory_entries_deduplicated(keyed_entries: List[Tuple[str, Dict[str, Any]]]) -> set:
+    """Write the entries whose payload changed since the last write; returns the keys that were written."""
+    pending = []
+    for key, entry in keyed_entries:
+        digest = _memory_payload_digest(entry)
+        if not _is_duplicate_memory_write(key, digest):
+            pending.append((key, entry, digest))
+    if not pending:
+        return set()
     
-    # Add to memory with searchable content
-    memory_service.add_session_to_memory(
-        session_data={
-            "user_id": user_id,
-            "content": f"Course: {course.title} - {course.description}. Level: {course.level}",
-            "metadata": course_data
-        }
-    )
+    _write_memory_entries([entry for _, entry, _ in pending], [key for key, _, _ in pending])
+    for key, _, digest in pending:
+        _record_memory_write(key, digest)
+    return {key for key, _, _ in pending}
+
+def add_user_to_memory(user_id: str, user_profile: UserProfile) -> None:
+    """Add user profile to memory service for long-term retrieval."""
+    # Add to memory with searchable content, unless the same profile was already written
+    written = _write_memory_entries_deduplicated([(f"user:{user_id}", _user_memory_entry(user_id, user_profile))])
     
-    log_tool_call("add_course_to_memory", {"user_id": user_id, "course_title": course.title}, None)
+    log_tool_call("add_user_to_memory", {"user_id": user_id, "name": user_profile.name, "written": bool(written)}, None)
+
+def add_course_to_memory(user_id: str, course: Course) -> None:
+    """Add course information to memory service."""
+    # Add to memory with searchable content, unless the same course was already written
+    written = _write_memory_entries_deduplicated([(f"course:{user_id}:{course.id}", _course_memory_entry(user_id, course))])
+    
+    log_tool_call("add_course_to_memory", {"user_id": user_id, "course_title": course.title, "written": bool(written)}, None)
+
+# Memory writes are idempotent and their result isn't needed to answer the user, so
+# the chat path hands them to a single background writer; pending writes are drained at exit
+_memory_writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-writer")
+atexit.register(_memory_writer_pool.shutdown, wait=True)
+
+def _log_memory_write_failure(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        log_error("memory_writer", error)
+
+def submit_memory_write(fn, *args, **kwargs) -> Future:
+    """Run a memory-service write on the background pool, logging failures."""
+    future = _memory_writer_pool.submit(fn, *args, **kwargs)
+    future.add_done_callback(_log_memory_write_failure)
+    return future
+
+def add_entities_to_memory(
+    user_id: str,
+    user_profile: Optional[UserProfile] = None,
+    course: Optional[Course] = None
+) -> None:
+    """Add a user profile and/or course to memory in a single batched write."""
+    entries = []
+    if user_profile:
+        entries.append((f"user:{user_profile.userId}", _user_memory_entry(user_profile.userId, user_profile)))
+    if course:
+        entries.append((f"course:{user_id}:{course.id}", _course_memory_entry(user_id, course)))
+    if not entries:
+        return
+    
+    written = _write_memory_entries_deduplicated(entries)
+    
+    log_tool_call("add_entities_to_memory", {
+        "user_id": user_id,
+        "name": user_profile.name if user_profile else None,
+        "course_title": course.title if course else None,
+        "written": len(written)
+    }, None)
 
 def get_user_courses_from_memory(user_id: str) -> List[Course]:
     """Retrieve user's courses from memory service."""
@@ -737,13 +1159,203 @@ def get_user_courses_from_memory(user_id: str) -> List[Course]:
         similarity_top_k=10
     )
     
-    courses = []
-    for result in search_results:
-        if result.get("metadata", {}).get("type") == "course":
-            course_data = result["metadata"]["course"]
-            courses.append(Course(**course_data))
+    # Filter and construct in a single pass
+    return [
+        Course(**result["metadata"]["course"])
+        for result in search_results
+        if result.get("metadata", {}).get("type") == "course"
+    ]
+
+# ------------------------------------------------------------------------
+# User History Index
+# ------------------------------------------------------------------------
+
+USER_HISTORY_TOP_K = 10
+_HISTORY_TERM_RE = re.compile(r"\w+")
+
+def _history_terms(text: str) -> Counter:
+    return Counter(_HISTORY_TERM_RE.findall(text.lower()))
+
+class UserHistoryIndex:
+    """
+    Per-user inverted index over the memory entries written by this process.
     
-    return courses
+    Entries are indexed once when they are written (re-writing an entity replaces its
+    entry), so a history search only touches the postings of the query terms instead of
+    scanning every stored memory.
+    """
+
+    def __init__(self):
+        # user_id -> entity key -> (entry, term counts)
+        self._entries: Dict[str, Dict[str, Tuple[Dict[str, Any], Counter]]] = defaultdict(dict)
+        # user_id -> term -> entity keys
+        self._postings: Dict[str, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, key: str, entry: Dict[str, Any]) -> None:
+        terms = _history_terms(entry.get("content", ""))
+        with self._lock:
+            entries, postings = self._entries[user_id], self._postings[user_id]
+            previous = entries.pop(key, None)
+            if previous is not None:
+                for term in previous[1]:
+                    postings[term].discard(key)
+            entries[key] = (entry, terms)
+            for term in terms:
+                postings[term].add(key)
+
+    def has_user(self, user_id: str) -> bool:
+        return bool(self._entries.get(user_id))
+
+    def search(self, user_id: str, query: str = "", top_k: int = USER_HISTORY_TOP_K) -> List[Dict[str, Any]]:
+        """Entries ranked by idf-weighted term overlap with the query; most recent first without a query."""
+        query_terms = _history_terms(query)
+        with self._lock:
+            entries = self._entries.get(user_id)
+            if not entries:
+                return []
+            if not query_terms:
+                return [entry for entry, _ in reversed(list(entries.values()))][:top_k]
+            postings = self._postings[user_id]
+            scores: Counter = Counter()
+            for term in query_terms:
+                keys = postings.get(term)
+                if not keys:
+                    continue
+                idf = math.log(1 + len(entries) / len(keys))
+                for key in keys:
+                    scores[key] += idf * entries[key][1][term]
+            return [entries[key][0] for key, _ in scores.most_common(top_k)]
+
+user_history_index = UserHistoryIndex()
+
+def search_user_history(user_id: str, query: str = "", top_k: int = USER_HISTORY_TOP_K) -> List[Dict[str, Any]]:
+    """Search a user's memory entries, using the in-process index and falling back to the memory service."""
+    if user_history_index.has_user(user_id):
+        results = user_history_index.search(user_id, query, top_k)
+        if results:
+            return results
+    search_query = f"user_id:{user_id}" + (f" {query}" if query else "")
+    return memory_service.search_memory(search_query, similarity_top_k=top_k)
+
+# ------------------------------------------------------------------------
+# Memory Micro-Batching
+# ------------------------------------------------------------------------
+
+MEMORY_BATCH_WINDOW = 0.01
+MEMORY_MAX_BATCH = 32
+
+class MicroBatcher:
+    """
+    Collects requests arriving within a short window (up to max_batch) and hands them to
+    process_batch in one call on a worker thread; each caller gets its own result back
+    through a future. process_batch must return one result per item, in order.
+    """
+
+    def __init__(
+        self,
+        process_batch,
+        name: str,
+        window: float = MEMORY_BATCH_WINDOW,
+        max_batch: int = MEMORY_MAX_BATCH
+    ):
+        self.process_batch = process_batch
+        self.name = name
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the worker task on the running event loop (idempotent)."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker and fail any request still waiting in the queue."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"{self.name} batcher stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result from the batch it lands in."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._process(batch)
+
+    async def _process(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await asyncio.to_thread(self.process_batch, [item for item, _ in batch])
+        except Exception as e:
+            log_error(f"MicroBatcher.{self.name}", e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+def search_user_history_batch(queries: List[Tuple[str, str, int]]) -> List[List[Dict[str, Any]]]:
+    """Answer several (user_id, query, top_k) history searches in one call."""
+    search_batch = getattr(memory_service, "search_memory_batch", None)
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+    remote = []
+    for i, (user_id, query, top_k) in enumerate(queries):
+        indexed = user_history_index.search(user_id, query, top_k) if user_history_index.has_user(user_id) else []
+        if indexed:
+            results[i] = indexed
+        else:
+            remote.append(i)
+    if remote and search_batch is not None:
+        remote_results = search_batch([
+            f"user_id:{queries[i][0]}" + (f" {queries[i][1]}" if queries[i][1] else "") for i in remote
+        ])
+        for i, found in zip(remote, remote_results):
+            results[i] = found[:queries[i][2]]
+    else:
+        for i in remote:
+            results[i] = search_user_history(*queries[i])
+    return results
+
+def add_courses_to_memory_batch(items: List[Tuple[str, Course]]) -> List[bool]:
+    """Write several (user_id, course) pairs to memory in one batched, deduplicated write.
+    Returns, per item, whether its entry was written (False when unchanged since the last write)."""
+    keys = [f"course:{user_id}:{course.id}" for user_id, course in items]
+    written = _write_memory_entries_deduplicated([
+        (key, _course_memory_entry(user_id, course)) for key, (user_id, course) in zip(keys, items)
+    ])
+    log_tool_call("add_courses_to_memory_batch", {"batch_size": len(items), "written": len(written)}, None)
+    return [key in written for key in keys]
+
+history_search_batcher = MicroBatcher(search_user_history_batch, "history_search")
+course_memory_batcher = MicroBatcher(add_courses_to_memory_batch, "course_memory")
 
 # Legacy functions for backward compatibility
 def initialize_session(user_id: str) -> str:
@@ -752,7 +1364,7 @@ def initialize_session(user_id: str) -> str:
 
 def update_session_state(session_id: str, new_state: SessionState, data: Dict[str, Any] = None) -> None:
     """Legacy function - update session state."""
-    updates = {"current_step": new_state.value}
+    updates = {"current_step": new_state}
     if data:
         updates.update(data)
     update_session_state_adk(session_id, updates)
@@ -763,11 +1375,11 @@ def add_to_memory(session_id: str, key: str, data: Any) -> None:
         context = get_user_context_from_session(session_id)
         user_id = context["user_id"]
         memory_key = f"{user_id}:{key}"
-        memory_service.add_session_to_memory({
+        _write_memory_entries([{
             "user_id": user_id,
             "content": f"{key}: {str(data)}",
             "metadata": {"key": key, "data": data}
-        })
+        }])
     except Exception as e:
         log_error("add_to_memory", e, session_id)
 
@@ -783,6 +1395,153 @@ def retrieve_from_memory(user_id: str, query: str) -> List[Dict[str, Any]]:
 # Chat Handling and Orchestration
 # ------------------------------------------------------------------------
 
+def _prepare_chat_turn(
+    session_id: str,
+    message: str,
+    user_profile: Optional[UserProfile],
+    current_course: Optional[Course]
+) -> Tuple[Dict[str, Any], Any, Dict[str, Any]]:
+    """
+    Apply any new profile/course data to the session and pick the root agent for this turn.
+    Returns (user_context, contextual_root_agent, agent_context).
+    """
+    # Get current session and context
+    user_context = get_user_context_from_session(session_id)
+    current_step_value = user_context["current_step"]
+    current_step = _STATE_BY_VALUE[current_step_value]
+    
+    print(f"Session {session_id} current state: {current_step_value}")
+    print(f"Session {session_id} - User Profile: {user_context['user_profile']}")
+    print(f"Session {session_id} - Current Course: {user_context['current_course']}")
+
+    # If we have new user profile or course data, update session state
+    if user_profile or current_course:
+        state_updates = {}
+        
+        if user_profile:
+            state_updates.update({
+                "user:profile_id": user_profile.userId,
+                "user:name": user_profile.name,
+                "user:email": user_profile.email,
+                "user:preferences": _to_state_value(user_profile.preferences or {})
+            })
+        
+        if current_course:
+            course_state_updates = {
+                "current_course_id": current_course.id,
+                "current_course_title": current_course.title,
+                "current_course_description": current_course.description,
+                "current_course_level": current_course.level
+            }
+            
+            # Store course_details_json as-is unless the backend needs strings
+            if current_course.course_details_json is not None:
+                if isinstance(current_course.course_details_json, dict):
+                    course_state_updates["current_course_details_json"] = _to_state_value(current_course.course_details_json)
+                else:
+                    course_state_updates["current_course_details_json"] = current_course.course_details_json
+            
+            state_updates.update(course_state_updates)
+        
+        # Add profile and course to memory for long-term storage in one write
+        memory_user_id = user_profile.userId if user_profile else getattr(user_context["user_profile"], "userId", None)
+        submit_memory_write(add_entities_to_memory, memory_user_id, user_profile, current_course)
+        
+        if state_updates:
+            update_session_state_adk(session_id, state_updates, "system")
+            # Refresh context after update, reusing the course details already fetched
+            # unless the current course itself changed
+            previous_course = user_context["current_course"]
+            same_course = not current_course or (previous_course is not None and previous_course.id == current_course.id)
+            user_context = get_user_context_from_session(
+                session_id,
+                prefetched_course_details=user_context["course_details"] if same_course else None,
+                skip_db_fetch=same_course
+            )
+
+    # Prepare enhanced context for agents
+    agent_context = {
+        "session_id": session_id,
+        "user_context": user_context,
+        "message": message,
+        "current_step": current_step_value
+    }
+
+    # The root agent carries the course context in its instruction and is reused
+    # across turns while that context is unchanged
+    contextual_root_agent = create_root_agent_with_context(user_context["course_context"])
+    
+    return user_context, contextual_root_agent, agent_context
+
+def _run_root_agent(contextual_root_agent, user_context: Dict[str, Any], message: str) -> Any:
+    # Pass the per-turn conversation context and the user message as separate inputs
+    # instead of concatenating them into one prompt string
+    return contextual_root_agent.run(
+        inputs={"context": user_context["memory_context"], "message": message},
+        state=user_context  # Pass full context as state (optional, but good practice)
+    )
+
+def _complete_chat_turn(
+    session_id: str,
+    message: str,
+    user_context: Dict[str, Any],
+    agent_result: Any
+) -> Dict[str, Any]:
+    """Record the agent's answer in the session state and build the chat result."""
+    if not agent_result:
+        return {
+            "response": "I encountered an issue processing your request. Please try again.",
+            "ui_updates": {},
+            "session_id": session_id,
+            "user_context": user_context
+        }
+    
+    agent_response_text = agent_result.get("response", "I'm processing your request...")
+    
+    # Update chat context in session state
+    chat_context_updates = user_context.get("chat_context", {})
+    chat_context_updates["last_message"] = message
+    chat_context_updates["last_response"] = agent_response_text
+    
+    state_updates = {
+        "chat_context": chat_context_updates,
+        "temp:last_interaction": f"User: {message} | Agent: {agent_response_text[:100]}..."
+    }
+    
+    # Apply any workflow-specific state changes based on agent result
+    if agent_result.get("next_step"):
+        state_updates["current_step"] = agent_result["next_step"]
+    
+    update_session_state_adk(session_id, state_updates, "agent")
+    
+    return {
+        "response": agent_response_text,
+        "ui_updates": agent_result.get("ui_updates", {}),
+        "session_id": session_id,
+        "user_context": user_context
+    }
+
+def _fail_chat_turn(session_id: str, error: Exception) -> Dict[str, Any]:
+    # The traceback goes through the logging handlers rather than a synchronous stderr write
+    log_error("handle_chat_message_enhanced", error, session_id, exc_info=True)
+    
+    # Update session to error state using ADK pattern
+    error_state_updates = {
+        "current_step": SessionState.ERROR,
+        "temp:last_error": str(error)
+    }
+    try:
+        update_session_state_adk(session_id, error_state_updates, "system")
+    except:
+        pass  # Don't fail on error state update failure
+        
+    return {
+        "response": "An internal error occurred while processing your message.",
+        "ui_updates": {"current_agent_id": "principal"},
+        "session_id": session_id,
+        "user_context": {}
+    }
+
 def handle_chat_message_enhanced(
     session_id: str, 
     message: str,
@@ -800,154 +1559,67 @@ def handle_chat_message_enhanced(
     }, session_id)
 
     try:
-        # Get current session and context
-        user_context = get_user_context_from_session(session_id)
-        current_step = SessionState(user_context["current_step"])
-        
-        print(f"Session {session_id} current state: {current_step.value}")
-        print(f"Session {session_id} - User Profile: {user_context['user_profile']}")
-        print(f"Session {session_id} - Current Course: {user_context['current_course']}")
-
-        # If we have new user profile or course data, update session state
-        if user_profile or current_course:
-            state_updates = {}
-            
-            if user_profile:
-                state_updates.update({
-                    "user:profile_id": user_profile.userId,
-                    "user:name": user_profile.name,
-                    "user:email": user_profile.email,
-                    "user:preferences": json.dumps(user_profile.preferences) if user_profile.preferences else "{}"
-                })
-                # Add to memory for long-term storage
-                add_user_to_memory(user_profile.userId, user_profile)
-            
-            if current_course:
-                course_state_updates = {
-                    "current_course_id": current_course.id,
-                    "current_course_title": current_course.title,
-                    "current_course_description": current_course.description,
-                    "current_course_level": current_course.level
-                }
-                
-                # Handle course_details_json serialization
-                if current_course.course_details_json is not None:
-                    if isinstance(current_course.course_details_json, dict):
-                        course_state_updates["current_course_details_json"] = json.dumps(current_course.course_details_json)
-                    else:
-                        course_state_updates["current_course_details_json"] = current_course.course_details_json
-                
-                state_updates.update(course_state_updates)
-                # Add to memory for long-term storage
-                add_course_to_memory(user_context["user_id"], current_course)
-            
-            if state_updates:
-                update_session_state_adk(session_id, state_updates, "system")
-                # Refresh context after update
-                user_context = get_user_context_from_session(session_id)
-
-        # Prepare enhanced context for agents
-        agent_context = {
-            "session_id": session_id,
-            "user_context": user_context,
-            "message": message,
-            "current_step": current_step.value
-        }
-
-        # Prepare agent input with consolidated context
-        consolidated_context = user_context.get("consolidated_context", "")
-        
-        # Create enhanced message that includes consolidated context
-        enhanced_message = f"{consolidated_context}\n\nUser Message: {message}" if consolidated_context else message
+        user_context, contextual_root_agent, agent_context = _prepare_chat_turn(
+            session_id, message, user_profile, current_course
+        )
         
         # Use root agent to orchestrate the response
-        # Create a new instance of the root agent with the consolidated context in its instruction
-        contextual_root_agent = create_root_agent_with_context(consolidated_context)
-        
         log_agent_call(contextual_root_agent.name, agent_context, session_id)
-        
-        # Pass the user message to the contextual root agent
-        agent_result = contextual_root_agent.run(
-            inputs={"message": message}, # Pass only the user message as context is in instruction
-            state=user_context  # Pass full context as state (optional, but good practice)
-        )
-        
+        agent_result = _run_root_agent(contextual_root_agent, user_context, message)
         log_agent_response(contextual_root_agent.name, agent_result, session_id)
 
         # Process agent result and update session state
-        if agent_result:
-            agent_response_text = agent_result.get("response", "I'm processing your request...")
-            
-            # Update chat context in session state
-            chat_context_updates = user_context.get("chat_context", {})
-            chat_context_updates["last_message"] = message
-            chat_context_updates["last_response"] = agent_response_text
-            
-            state_updates = {
-                "chat_context": chat_context_updates,
-                "temp:last_interaction": f"User: {message} | Agent: {agent_response_text[:100]}..."
-            }
-            
-            # Apply any workflow-specific state changes based on agent result
-            if agent_result.get("next_step"):
-                state_updates["current_step"] = agent_result["next_step"]
-            
-            update_session_state_adk(session_id, state_updates, "agent")
-            
-            # Prepare UI updates
-            ui_updates = agent_result.get("ui_updates", {})
-            
-            return {
-                "response": agent_response_text,
-                "ui_updates": ui_updates,
-                "session_id": session_id,
-                "user_context": user_context
-            }
-        else:
-            return {
-                "response": "I encountered an issue processing your request. Please try again.",
-                "ui_updates": {},
-                "session_id": session_id,
-                "user_context": user_context
-            }
+        return _complete_chat_turn(session_id, message, user_context, agent_result)
 
     except Exception as e:
-        log_error("handle_chat_message_enhanced", e, session_id)
-        import traceback
-        traceback.print_exc()
-        
-        # Update session to error state using ADK pattern
-        error_state_updates = {
-            "current_step": SessionState.ERROR.value,
-            "temp:last_error": str(e)
-        }
-        try:
-            update_session_state_adk(session_id, error_state_updates, "system")
-        except:
-            pass  # Don't fail on error state update failure
-            
-        return {
-            "response": "An internal error occurred while processing your message.",
-            "ui_updates": {"current_agent_id": "principal"},
-            "session_id": session_id,
-            "user_context": {}
-        }
+        return _fail_chat_turn(session_id, e)
 
 # ------------------------------------------------------------------------
 # Session Initialization API for External Integration
 # ------------------------------------------------------------------------
 
-def initialize_session_for_api(user_id: str, course_id: Optional[str] = None) -> Dict[str, Any]:
+def _user_profile_from_data(user_profile_data: Dict[str, Any]) -> UserProfile:
+    """Build a UserProfile from an already-dumped request dict."""
+    return UserProfile(
+        userId=user_profile_data.get("userId"),
+        name=user_profile_data.get("name"),
+        email=user_profile_data.get("email"),
+        courses=[Course(**c) for c in user_profile_data.get("courses", [])],
+        preferences=user_profile_data.get("preferences", {})
+    )
+
+def _course_from_data(current_course_data: Dict[str, Any]) -> Course:
+    """Build a Course from an already-dumped request dict."""
+    return Course(
+        id=current_course_data.get("id"),
+        title=current_course_data.get("title"),
+        description=current_course_data.get("description"),
+        level=current_course_data.get("level"),
+        course_details_json=current_course_data.get("course_details_json")
+    )
+
+def initialize_session_for_api(
+    user_id: str,
+    course_id: Optional[str] = None,
+    user_profile_data: Optional[Dict[str, Any]] = None,
+    current_course_data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """
     Initializes a new session for API interaction, fetching user and course data from the database.
+    Profile and course dicts already dumped from the request are used as-is when given.
     """
-    log_agent_call("initialize_session_for_api", {"user_id": user_id, "course_id": course_id}, None)
+    log_agent_call("initialize_session_for_api", {"user_id": user_id, "course_id": course_id, "has_profile_data": user_profile_data is not None, "has_course_data": current_course_data is not None}, None)
     try:
-        # Placeholder for fetching user profile and course from database
-        # In a real system, this would involve database queries
-        user_profile = UserProfile(userId=user_id, name="Test User", email="test@example.com", preferences={"theme": "dark"})
+        if user_profile_data:
+            user_profile = _user_profile_from_data(user_profile_data)
+        else:
+            # Placeholder for fetching user profile and course from database
+            # In a real system, this would involve database queries
+            user_profile = UserProfile(userId=user_id, name="Test User", email="test@example.com", preferences={"theme": "dark"})
         current_course = None
-        if course_id:
+        if current_course_data:
+            current_course = _course_from_data(current_course_data)
+        elif course_id:
             current_course = Course(
                 id=course_id,
                 title="Test Course",
@@ -958,10 +1630,10 @@ def initialize_session_for_api(user_id: str, course_id: Optional[str] = None) ->
         session_id = initialize_session_with_user_context(user_id, user_profile, current_course)
         
         log_agent_response("initialize_session_for_api", {"session_id": session_id}, session_id)
-        return {"session_id": session_id}
+        return {"status": "success", "session_id": session_id}
     except Exception as e:
         log_error("initialize_session_for_api", e, None)
-        return {"error": str(e)}
+        return {"status": "error", "message": str(e), "error": str(e)}
         
 
 def update_session_context(
@@ -995,16 +1667,10 @@ def update_session_context(
                 "user:profile_id": user_profile_data.get("userId"),
                 "user:name": user_profile_data.get("name"),
                 "user:email": user_profile_data.get("email"),
-                "user:preferences": json.dumps(user_profile_data.get("preferences", {}))
+                "user:preferences": _to_state_value(user_profile_data.get("preferences", {}))
             })
-            # Update user in memory as well
-            user_profile = UserProfile(
-                userId=user_profile_data.get("userId"),
-                name=user_profile_data.get("name"),
-                email=user_profile_data.get("email"),
-                courses=[Course(**c) for c in user_profile_data.get("courses", [])],
-                preferences=user_profile_data.get("preferences", {})
-            )
+            # Update user in memory as well, from the same dict
+            user_profile = _user_profile_from_data(user_profile_data)
             add_user_to_memory(user_profile.userId, user_profile)
 
         if current_course_data:
@@ -1014,13 +1680,8 @@ def update_session_context(
                 "current_course_description": current_course_data.get("description"),
                 "current_course_level": current_course_data.get("level")
             })
-            # Update course in memory as well
-            current_course = Course(
-                id=current_course_data.get("id"),
-                title=current_course_data.get("title"),
-                description=current_course_data.get("description"),
-                level=current_course_data.get("level")
-            )
+            # Update course in memory as well, from the same dict
+            current_course = _course_from_data(current_course_data)
             add_course_to_memory(session.user_id, current_course) # Assuming user_id is available in session
 
         if state_updates:
@@ -1,9 +1,13 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from .logger import log_api_request, log_api_response, log_error
 
 from google.adk.agents.llm_agent import LlmAgent
@@ -24,8 +28,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory store for session states (for demonstration purposes)
-session_states: Dict[str, UserInteractionState] = {}
+class SessionStateStore:
+    """
+    Bounded in-memory store for session states: least recently used entries are evicted
+    past maxsize and entries expire ttl seconds after their last write. Access is guarded
+    by a lock since worker threads may share the store.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, UserInteractionState]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> Optional[UserInteractionState]:
+        if not session_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+    def __contains__(self, session_id: Optional[str]) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> UserInteractionState:
+        state = self.get(session_id)
+        if state is None:
+            raise KeyError(session_id)
+        return state
+
+    def __setitem__(self, session_id: str, state: UserInteractionState) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.monotonic(), state)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# In-memory store for session states (for demonstration purposes), bounded so long-running servers don't grow without limit
+session_states = SessionStateStore(maxsize=10000, ttl=3600)
+
+# ------------------------------------------------------------------------
+# Step handlers for the simulated /run workflow
+# Each returns (response_content, ui_updates, next_step).
+# ------------------------------------------------------------------------
+
+StepResult = Tuple[str, Dict[str, Any], str]
+
+def _handle_default(user_message: str, current_state: UserInteractionState) -> StepResult:
+    # Reset to principal if confused
+    return "Je n'ai pas compris votre demande. Pouvez-vous reformuler?", {"current_agent_id": "principal"}, current_state.current_step
+
+def _handle_initial(user_message: str, current_state: UserInteractionState) -> StepResult:
+    if "biologie introductive" not in user_message.lower():
+        return _handle_default(user_message, current_state)
+    return (
+        "Excellent! Pour commencer, quels sont les objectifs d'apprentissage spécifiques pour ce cours de biologie introductive?",
+        {"taskParameters": {"course": "Biologie introductive"}, "current_agent_id": "objectifs"},
+        "objectives_definition"
+    )
+
+def _handle_objectives(user_message: str, current_state: UserInteractionState) -> StepResult:
+    return (
+        "Très bien. Maintenant, quelle approche pédagogique souhaitez-vous adopter pour atteindre ces objectifs? (ex: apprentissage par problèmes, cours magistral, etc.)",
+        {"taskParameters": {"learningObjectives": user_message}, "current_agent_id": "pedagogie"},
+        "pedagogical_approach"
+    )
+
+def _handle_pedagogical_approach(user_message: str, current_state: UserInteractionState) -> StepResult:
+    return (
+        "Compris. À quel niveau de la taxonomie de Bloom souhaitez-vous que les questions soient principalement axées? (ex: Compréhension, Application, Analyse)",
+        {"taskParameters": {"outputType": user_message}, "current_agent_id": "bloom"}, # Misusing outputType for now, should be a new field
+        "bloom_level_assessment"
+    )
+
+def _handle_bloom_level(user_message: str, current_state: UserInteractionState) -> StepResult:
+    return (
+        "Parfait. Veuillez spécifier le nombre de questions par type (ex: QCM:5, Vrai/Faux:3, Réponse Courte:2) et la difficulté générale (facile, moyen, difficile).",
+        {"taskParameters": {"bloomsLevel": user_message}, "current_agent_id": "questions"},
+        "question_generation"
+    )
+
+def _handle_question_generation(user_message: str, current_state: UserInteractionState) -> StepResult:
+    # This is where the actual quiz generation would happen
+    # For now, simulate a generated exam
+    generated_exam = {
+        "title": "Examen de Biologie Introductive",
+        "course": current_state.task_parameters.get("course", "Biologie Introductive"),
+        "duration": "60 minutes",
+        "instructions": "Répondez à toutes les questions. Bonne chance!",
+        "questions": [
+            {"id": "q1", "type": "QCM", "points": 5, "text": "Quelle est la fonction principale des mitochondries?", "options": [{"id": "a", "text": "Production d'énergie"}, {"id": "b", "text": "Synthèse des protéines"}]},
+            {"id": "q2", "type": "Vrai/Faux", "points": 3, "text": "La photosynthèse se produit dans les racines des plantes."},
+            {"id": "q3", "type": "Réponse Courte", "points": 7, "text": "Décrivez brièvement le cycle de Krebs."}
+        ]
+    }
+    return (
+        "L'examen a été généré avec succès! Vous pouvez le consulter et le modifier.",
+        {"generatedExam": generated_exam, "current_agent_id": "createur"},
+        "finalized" # Mark as finalized
+    )
+
+_STEP_HANDLERS: Dict[str, Callable[[str, UserInteractionState], StepResult]] = {
+    "initial": _handle_initial,
+    "objectives_definition": _handle_objectives,
+    "pedagogical_approach": _handle_pedagogical_approach,
+    "bloom_level_assessment": _handle_bloom_level,
+    "question_generation": _handle_question_generation,
+}
 
 @app.post("/run") # Renamed from /agent_chat as per frontend's /run endpoint
 async def run_agent_workflow(request: Request):
@@ -54,16 +172,15 @@ async def run_agent_workflow(request: Request):
     if not user_message:
         return JSONResponse(content={"detail": "Message cannot be empty"}, status_code=400)
 
-    if not session_id or session_id not in session_states:
+    current_state = session_states.get(session_id)
+    if current_state is None:
         # Initialize a new session
         session_id = str(uuid.uuid4())
         # Pass user_id and potentially other initial profile data to initialize_session
-        initial_state = aws.initialize_session(user_id) # Pass user_id
-        session_states[session_id] = initial_state
+        current_state = await asyncio.to_thread(aws.initialize_session, user_id) # Pass user_id; kept off the event loop
+        session_states[session_id] = current_state
         print(f"Initialized new session: {session_id}")
     
-    current_state = session_states[session_id]
-    
     # Update current_state with course and user profile data
     if course_data:
         current_state.current_course = Course(**course_data)
@@ -96,77 +213,30 @@ async def run_agent_workflow(request: Request):
         #         # Add other tools from your tools.py here
         #     ]
         # )
-        # agent_response = await agent.run(user_message, state=current_state)
+        # agent_response = await asyncio.to_thread(agent.run, user_message, state=current_state)
         # response_content = agent_response.output.text
 
         # For now, let's simulate a response and state update
-        response_content = f"Received: '{user_message}'. Processing..."
-        ui_updates = {}
-
-        # Simulate progression through agents based on message content or step
-        if "biologie introductive" in user_message.lower() and current_state.current_step == "initial":
-            current_state.current_step = "objectives_definition"
-            response_content = "Excellent! Pour commencer, quels sont les objectifs d'apprentissage spécifiques pour ce cours de biologie introductive?"
-            ui_updates["taskParameters"] = {"course": "Biologie introductive"}
-            ui_updates["current_agent_id"] = "objectifs"
-        elif current_state.current_step == "objectives_definition":
-            current_state.current_step = "pedagogical_approach"
-            response_content = "Très bien. Maintenant, quelle approche pédagogique souhaitez-vous adopter pour atteindre ces objectifs? (ex: apprentissage par problèmes, cours magistral, etc.)"
-            ui_updates["taskParameters"] = {"learningObjectives": user_message}
-            ui_updates["current_agent_id"] = "pedagogie"
-        elif current_state.current_step == "pedagogical_approach":
-            current_state.current_step = "bloom_level_assessment"
-            response_content = "Compris. À quel niveau de la taxonomie de Bloom souhaitez-vous que les questions soient principalement axées? (ex: Compréhension, Application, Analyse)"
-            ui_updates["taskParameters"] = {"outputType": user_message} # Misusing outputType for now, should be a new field
-            ui_updates["current_agent_id"] = "bloom"
-        elif current_state.current_step == "bloom_level_assessment":
-            current_state.current_step = "question_generation"
-            response_content = "Parfait. Veuillez spécifier le nombre de questions par type (ex: QCM:5, Vrai/Faux:3, Réponse Courte:2) et la difficulté générale (facile, moyen, difficile)."
-            ui_updates["taskParameters"] = {"bloomsLevel": user_message}
-            ui_updates["current_agent_id"] = "questions"
-        elif current_state.current_step == "question_generation":
-            # This is where the actual quiz generation would happen
-            # For now, simulate a generated exam
-            generated_exam = {
-                "title": "Examen de Biologie Introductive",
-                "course": session_states[session_id].task_parameters.get("course", "Biologie Introductive"),
-                "duration": "60 minutes",
-                "instructions": "Répondez à toutes les questions. Bonne chance!",
-                "questions": [
-                    {"id": "q1", "type": "QCM", "points": 5, "text": "Quelle est la fonction principale des mitochondries?", "options": [{"id": "a", "text": "Production d'énergie"}, {"id": "b", "text": "Synthèse des protéines"}]},
-                    {"id": "q2", "type": "Vrai/Faux", "points": 3, "text": "La photosynthèse se produit dans les racines des plantes."},
-                    {"id": "q3", "type": "Réponse Courte", "points": 7, "text": "Décrivez brièvement le cycle de Krebs."}
-                ]
-            }
-            response_content = "L'examen a été généré avec succès! Vous pouvez le consulter et le modifier."
-            ui_updates["generatedExam"] = generated_exam
-            ui_updates["current_agent_id"] = "createur"
-            current_state.current_step = "finalized" # Mark as finalized
-        else:
-            response_content = "Je n'ai pas compris votre demande. Pouvez-vous reformuler?"
-            ui_updates["current_agent_id"] = "principal" # Reset to principal if confused
+        # Simulate progression through agents based on the current step
+        handler = _STEP_HANDLERS.get(current_state.current_step, _handle_default)
+        response_content, ui_updates, next_step = handler(user_message, current_state)
+        current_state.current_step = next_step
 
         session_states[session_id] = current_state # Update the state
 
-        return JSONResponse(content={
+        response_payload = {
             "session_id": session_id,
             "response": response_content,
             "ui_updates": ui_updates
-        })
+        }
+        # Log the response before sending it
+        log_api_response("/run", response_payload, session_id)
+        return JSONResponse(content=response_payload)
 
     except Exception as e:
         log_error("run_agent_workflow", e, session_id)
         return JSONResponse(content={"detail": str(e)}, status_code=500)
 
-    finally:
-        # Log the response before sending it
-        response_content = {
-            "session_id": session_id,
-            "response": response_content,
-            "ui_updates": ui_updates
-        }
-        log_api_response("/run", response_content, session_id)
-
 # The /generate-quiz endpoint remains as is, as it's a direct tool call.
 # @app.post("/generate-quiz")
 # async def generate_quiz_endpoint(request: Request):
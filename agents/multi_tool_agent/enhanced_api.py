@@ -5,10 +5,15 @@ Provides comprehensive session management and chat handling with proper ADK inte
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple
+import asyncio
 import logging
-import traceback
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from .agentic_workflow_system import (
@@ -18,12 +23,14 @@ from .agentic_workflow_system import (
     get_session_info,
     get_user_context_from_session,
     add_user_to_memory,
-    add_course_to_memory,
     get_user_courses_from_memory,
-    memory_service,
+    history_search_batcher,
+    course_memory_batcher,
     session_service,
     APP_NAME
 )
+
+from . import fast_json
 from .logger import log_agent_call, log_agent_response, log_error
 from .models import Course, UserProfile
 
@@ -31,11 +38,16 @@ from .models import Course, UserProfile
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The ADK session/memory calls are synchronous; endpoints run them on this many worker threads
+API_EXECUTOR_WORKERS = 64
+
 # Initialize FastAPI app
+# Responses are serialized with orjson when it is installed
 app = FastAPI(
     title="Pedagogical Agent API",
     description="Enhanced API for course planning and assessment generation with proper session management",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse if fast_json.orjson is not None else JSONResponse
 )
 
 # Add CORS middleware
@@ -51,6 +63,18 @@ app.add_middleware(
 # Request/Response Models
 # ------------------------------------------------------------------------
 
+_timestamp_cache = (0, "")
+
+def _now_iso() -> str:
+    """Current local time as ISO text, formatted at most once per second."""
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, cached_text = _timestamp_cache
+    if second != cached_second:
+        cached_text = datetime.fromtimestamp(second).isoformat()
+        _timestamp_cache = (second, cached_text)
+    return cached_text
+
 class UserProfileData(BaseModel):
     userId: str
     name: str
@@ -85,7 +109,7 @@ class APIResponse(BaseModel):
     status: str
     message: str
     data: Dict[str, Any] = Field(default_factory=dict)
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = Field(default_factory=_now_iso)
 
 class ChatResponse(BaseModel):
     status: str
@@ -93,7 +117,7 @@ class ChatResponse(BaseModel):
     ui_updates: Dict[str, Any] = Field(default_factory=dict)
     session_id: str
     user_context: Dict[str, Any] = Field(default_factory=dict)
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = Field(default_factory=_now_iso)
 
 # ------------------------------------------------------------------------
 # Error Handling
@@ -101,8 +125,8 @@ class ChatResponse(BaseModel):
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception handler: {str(exc)}")
-    logger.error(f"Traceback: {traceback.format_exc()}")
+    # exc_info defers traceback formatting to the logging handlers
+    logger.error("Global exception handler: %s", exc, exc_info=exc)
     
     return APIResponse(
         status="error",
@@ -127,6 +151,87 @@ async def health_check():
         }
     )
 
+# ------------------------------------------------------------------------
+# Request Model Conversion
+# ------------------------------------------------------------------------
+
+PROFILE_CACHE_SIZE = 1024
+
+def _model_to_dict(model: BaseModel) -> Dict[str, Any]:
+    """Dump only the fields the client actually sent (Pydantic v2, falling back to v1)."""
+    if hasattr(model, "model_dump"):
+        return model.model_dump(mode="python", exclude_unset=True)
+    return model.dict(exclude_unset=True)
+
+def _model_json(model: BaseModel) -> str:
+    if hasattr(model, "model_dump_json"):
+        return model.model_dump_json()
+    return model.json()
+
+# Converted objects keyed by (session_id, model JSON), so a profile or course resent
+# unchanged on every turn is only rebuilt once per session
+_converted_objects: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+_converted_objects_lock = threading.Lock()
+
+def _cached_conversion(kind: str, session_id: str, model: BaseModel, build: Callable[[BaseModel], Any]) -> Any:
+    # The JSON dump is only the fingerprint; objects are built from the model's
+    # attributes, so nothing is re-parsed from the serialized form
+    key = (kind, session_id, _model_json(model))
+    with _converted_objects_lock:
+        converted = _converted_objects.get(key)
+        if converted is not None:
+            _converted_objects.move_to_end(key)
+            return converted
+    converted = build(model)
+    with _converted_objects_lock:
+        _converted_objects[key] = converted
+        while len(_converted_objects) > PROFILE_CACHE_SIZE:
+            _converted_objects.popitem(last=False)
+    return converted
+
+def _build_user_profile(profile: UserProfileData) -> UserProfile:
+    return UserProfile(
+        userId=profile.userId,
+        name=profile.name,
+        email=profile.email,
+        preferences=profile.preferences,
+        courses=[Course(**course_data) for course_data in profile.courses]
+    )
+
+def _build_course(course: CourseData) -> Course:
+    return Course(
+        id=course.id,
+        title=course.title,
+        description=course.description,
+        level=course.level,
+        course_details_json=course.course_details_json
+    )
+
+# Profiles with more courses than this are converted on a worker thread, off the event loop
+COURSE_OFFLOAD_THRESHOLD = 500
+
+async def _build_user_profile_async(profile: UserProfileData) -> UserProfile:
+    if len(profile.courses) > COURSE_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(_build_user_profile, profile)
+    return _build_user_profile(profile)
+
+def _chat_request_objects(request: ChatMessageRequest) -> Tuple[Optional[UserProfile], Optional[Course]]:
+    """Convert the request's profile and course payloads to domain objects, reusing unchanged ones."""
+    user_profile = None
+    if request.user_profile:
+        user_profile = _cached_conversion("profile", request.session_id, request.user_profile, _build_user_profile)
+    
+    current_course = None
+    if request.current_course:
+        current_course = _cached_conversion("course", request.session_id, request.current_course, _build_course)
+    
+    return user_profile, current_course
+
+async def _chat_request_objects_async(request: ChatMessageRequest) -> Tuple[Optional[UserProfile], Optional[Course]]:
+    if request.user_profile and len(request.user_profile.courses) > COURSE_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(_chat_request_objects, request)
+    return _chat_request_objects(request)
+
 # ------------------------------------------------------------------------
 # Session Management Endpoints
 # ------------------------------------------------------------------------
@@ -144,11 +249,12 @@ async def initialize_session(request: SessionInitRequest):
         }, None)
         
         # Convert Pydantic models to dicts
-        user_profile_data = request.user_profile.dict() if request.user_profile else None
-        current_course_data = request.current_course.dict() if request.current_course else None
+        user_profile_data = _model_to_dict(request.user_profile) if request.user_profile else None
+        current_course_data = _model_to_dict(request.current_course) if request.current_course else None
         
         # Initialize session
-        result = initialize_session_for_api(
+        result = await asyncio.to_thread(
+            initialize_session_for_api,
             user_id=request.user_id,
             user_profile_data=user_profile_data,
             current_course_data=current_course_data
@@ -174,7 +280,7 @@ async def get_session(session_id: str):
     Get session information and context
     """
     try:
-        result = get_session_info(session_id)
+        result = await asyncio.to_thread(get_session_info, session_id)
         
         if result["status"] == "success":
             return APIResponse(
@@ -202,10 +308,11 @@ async def update_session(session_id: str, request: SessionUpdateRequest):
         }, session_id)
         
         # Convert Pydantic models to dicts
-        user_profile_data = request.user_profile.dict() if request.user_profile else None
-        current_course_data = request.current_course.dict() if request.current_course else None
+        user_profile_data = _model_to_dict(request.user_profile) if request.user_profile else None
+        current_course_data = _model_to_dict(request.current_course) if request.current_course else None
         
-        result = update_session_context(
+        result = await asyncio.to_thread(
+            update_session_context,
             session_id=session_id,
             user_profile_data=user_profile_data,
             current_course_data=current_course_data
@@ -243,28 +350,11 @@ async def handle_chat(request: ChatMessageRequest):
         }, request.session_id)
         
         # Convert Pydantic models to proper objects if provided
-        user_profile = None
-        if request.user_profile:
-            user_profile = UserProfile(
-                userId=request.user_profile.userId,
-                name=request.user_profile.name,
-                email=request.user_profile.email,
-                preferences=request.user_profile.preferences,
-                courses=[Course(**course_data) for course_data in request.user_profile.courses]
-            )
-        
-        current_course = None
-        if request.current_course:
-            current_course = Course(
-                id=request.current_course.id,
-                title=request.current_course.title,
-                description=request.current_course.description,
-                level=request.current_course.level,
-                course_details_json=request.current_course.course_details_json
-            )
+        user_profile, current_course = await _chat_request_objects_async(request)
         
         # Handle chat message with enhanced context
-        result = handle_chat_message_enhanced(
+        result = await asyncio.to_thread(
+            handle_chat_message_enhanced,
             session_id=request.session_id,
             message=request.message,
             user_profile=user_profile,
@@ -305,15 +395,15 @@ async def get_user_history(user_id: str, query: str = ""):
     Get user's historical data and interactions
     """
     try:
-        search_query = f"user_id:{user_id}" + (f" {query}" if query else "")
-        results = memory_service.search_memory(search_query, similarity_top_k=10)
+        # Concurrent history lookups are micro-batched into one memory search call
+        results = await history_search_batcher.submit((user_id, query, 10))
         
         return APIResponse(
             status="success",
             message="User history retrieved",
             data={
                 "user_id": user_id,
-                "query": search_query,
+                "query": f"user_id:{user_id}" + (f" {query}" if query else ""),
                 "results": results,
                 "count": len(results)
             }
@@ -329,7 +419,7 @@ async def get_user_courses(user_id: str):
     Get user's courses from memory
     """
     try:
-        courses = get_user_courses_from_memory(user_id)
+        courses = await asyncio.to_thread(get_user_courses_from_memory, user_id)
         courses_data = [
             {
                 "id": course.id,
@@ -360,15 +450,9 @@ async def add_user_profile(user_id: str, profile: UserProfileData):
     Add or update user profile in memory
     """
     try:
-        user_profile = UserProfile(
-            userId=profile.userId,
-            name=profile.name,
-            email=profile.email,
-            preferences=profile.preferences,
-            courses=[Course(**course_data) for course_data in profile.courses]
-        )
+        user_profile = await _build_user_profile_async(profile)
         
-        add_user_to_memory(user_id, user_profile)
+        await asyncio.to_thread(add_user_to_memory, user_id, user_profile)
         
         return APIResponse(
             status="success",
@@ -397,7 +481,8 @@ async def add_user_course(user_id: str, course: CourseData):
             level=course.level
         )
         
-        add_course_to_memory(user_id, course_obj)
+        # Concurrent course additions are micro-batched into one memory write
+        await course_memory_batcher.submit((user_id, course_obj))
         
         return APIResponse(
             status="success",
@@ -507,6 +592,10 @@ async def debug_delete_session(session_id: str):
 async def startup_event():
     """Initialize the application on startup"""
     logger.info("Starting Pedagogical Agent Enhanced API")
+    # Size the default executor used by asyncio.to_thread for the blocking ADK calls
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=API_EXECUTOR_WORKERS, thread_name_prefix="adk")
+    )
     logger.info(f"App Name: {APP_NAME}")
     logger.info("ADK Session and Memory services initialized")
 
@@ -514,6 +603,8 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on application shutdown"""
     logger.info("Shutting down Pedagogical Agent Enhanced API")
+    await history_search_batcher.stop()
+    await course_memory_batcher.stop()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,57 @@
+"""
+Thin JSON shim: uses orjson when it is installed and falls back to the standard library.
+Output keeps non-ASCII characters as-is; dump() streams through python-rapidjson when available.
+"""
+
+import dataclasses
+import json
+from typing import Any, BinaryIO, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import rapidjson
+except ImportError:
+    rapidjson = None
+
+DUMP_CHUNK_SIZE = 64 * 1024
+
+def _encode_dataclass(obj: Any) -> Any:
+    # Stdlib fallback for what orjson serializes natively
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj: Any, *, pretty: bool = False) -> str:
+    """Serialize obj to a JSON string, indented by 2 spaces when pretty is set."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False, default=_encode_dataclass)
+
+def dumpb(obj: Any, *, pretty: bool = False) -> bytes:
+    """Serialize obj (dataclasses included) to UTF-8 JSON bytes, ready to write to a binary file."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    return dumps(obj, pretty=pretty).encode("utf-8")
+
+def dump(obj: Any, fp: BinaryIO, *, pretty: bool = False) -> None:
+    """
+    Write obj as JSON to a binary file. With python-rapidjson the output is streamed in
+    DUMP_CHUNK_SIZE chunks, so large documents are never held in memory as a whole.
+    """
+    if rapidjson is not None:
+        rapidjson.dump(obj, fp, indent=2 if pretty else None, ensure_ascii=False,
+                       default=_encode_dataclass, chunk_size=DUMP_CHUNK_SIZE)
+        return
+    fp.write(dumpb(obj, pretty=pretty))
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Deserialize a JSON document from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -3,13 +3,25 @@ Logging configuration for the multi_tool_agent.
 Provides standardized logging for API calls and responses.
 """
 
+import atexit
+import functools
+import io
 import logging
 import json
+import queue
 import sys
 import os
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any, Dict, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Get the absolute path of the script's directory
 # Use __file__ to correctly get the path of the current script
 script_dir = os.path.abspath(os.path.dirname(__file__))
@@ -20,13 +32,14 @@ script_dir = os.path.abspath(os.path.dirname(__file__))
 # os.path.dirname(script_dir) is agents
 # logs_dir is agents/logs
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(script_dir)), "logs") # Corrected path to be ../logs relative to multi_tool_agent
-os.makedirs(logs_dir, exist_ok=True)
+if not os.path.isdir(logs_dir):
+    os.makedirs(logs_dir, exist_ok=True)
 
 
 # Configure multi_tool_agent logger
 logger = logging.getLogger("multi_tool_agent")
 logger.setLevel(logging.DEBUG)  # Capture all messages from DEBUG up for this logger
-logger.propagate = False # Prevent messages from being passed to parent (root) logger
+logger.propagate = True # Records reach the shared queue handler through the root logger
 
 # Clear existing handlers to prevent duplicate output if module is reloaded
 if logger.handlers:
@@ -34,47 +47,94 @@ if logger.handlers:
         logger.removeHandler(handler)
         handler.close() # Close handler when removing
 
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 1.0
+
+class BufferedFileHandler(logging.StreamHandler):
+    """
+    File handler writing through a large BufferedWriter, so records cost one write()
+    syscall per buffer instead of one per record; a daemon thread flushes the buffer
+    every flush_interval seconds so the file never lags far behind.
+    """
+
+    def __init__(self, filename: str, buffer_size: int = LOG_BUFFER_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.baseFilename = os.path.abspath(filename)
+        super().__init__(io.BufferedWriter(open(self.baseFilename, "ab", buffering=0), buffer_size))
+        self._stop_flushing = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,), name="log-flusher", daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stop_flushing.wait(interval):
+            self.flush()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write((self.format(record) + self.terminator).encode("utf-8"))
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        self._stop_flushing.set()
+        self.acquire()
+        try:
+            if self.stream:
+                try:
+                    self.stream.flush()
+                finally:
+                    self.stream.close()
+                    self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+class _FastFormatter(logging.Formatter):
+    """
+    Formatter that renders the "YYYY-MM-DD HH:MM:SS" part of asctime once per second
+    instead of calling localtime/strftime for every record.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached = (None, "")
+
+    def formatTime(self, record: logging.LogRecord, datefmt: Optional[str] = None) -> str:
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_str = self._cached
+        if second != cached_second:
+            cached_str = time.strftime(self.default_time_format, self.converter(second))
+            self._cached = (second, cached_str)
+        return self.default_msec_format % (cached_str, record.msecs)
+
+# One formatter shared by the console and file handlers
+_FMT = _FastFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
 # Console handler for multi_tool_agent logger
 console_handler = logging.StreamHandler(sys.stdout)
-console_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(console_format)
+console_handler.setFormatter(_FMT)
 console_handler.setLevel(logging.INFO) # Console shows INFO and above for multi_tool_agent
-logger.addHandler(console_handler)
+# Only multi_tool_agent records reach the console; root records are file-only
+console_handler.addFilter(logging.Filter("multi_tool_agent"))
+output_handlers = [console_handler]
 
 # File handler
 try:
     log_filename = f"multi_tool_agent_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
     file_path = os.path.join(logs_dir, log_filename)
     
-    # This file_handler will be used by multi_tool_agent logger AND the root logger
-    file_handler = logging.FileHandler(
-        file_path,
-        encoding='utf-8',
-        delay=False 
-    )
-    file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_format)
+    # This file_handler receives records from the multi_tool_agent logger AND the root logger
+    file_handler = BufferedFileHandler(file_path)
+    # Registered before the listener's stop so it runs after it: the queue drains, then the tail is flushed
+    atexit.register(file_handler.close)
+    file_handler.setFormatter(_FMT)
     file_handler.setLevel(logging.DEBUG)  # File logs DEBUG and above for all sources
-    
-    # Add file_handler to multi_tool_agent logger
-    logger.addHandler(file_handler)
-
-    # Configure root logger to also use this file_handler
-    # This will capture logs from other modules (e.g., google_llm, fast_api)
-    # that propagate to the root logger.
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG) # Ensure root logger processes DEBUG messages for its handlers
-
-    # Add file_handler to root logger only if a similar handler isn't already present
-    is_handler_present = any(
-        isinstance(h, logging.FileHandler) and getattr(h, 'baseFilename', None) == file_handler.baseFilename
-        for h in root_logger.handlers
-    )
-    if not is_handler_present:
-        root_logger.addHandler(file_handler)
+    output_handlers.append(file_handler)
     
     print(f"Logging to file: {file_path}") # This print is for immediate feedback
-    logger.debug("File logging initialized for multi_tool_agent logger. Root logger also configured to use this file handler.")
 
 except Exception as e:
     # Use root logger for this error as our logger might be the one failing
@@ -82,57 +142,121 @@ except Exception as e:
     # Also print to console as a fallback
     print(f"CRITICAL: Error setting up file handler: {e}")
 
+# A background listener thread owns the console and file handlers, so the stream and file
+# writes (and their locks) happen off the calling thread. The message itself, including
+# deferred _Lazy payloads and exception tracebacks, is still formatted by the caller in
+# QueueHandler.prepare, which keeps records safe from later mutation of the logged data.
+_log_queue = queue.Queue(-1)
+queue_handler = QueueHandler(_log_queue)
+queue_handler._multi_tool_agent = True
+
+# The queue handler lives on the root logger only: multi_tool_agent records propagate to it,
+# and logs from other modules (e.g., google_llm, fast_api) are captured there too,
+# so every record takes a single handler path.
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.DEBUG) # Ensure root logger processes DEBUG messages for its handlers
+for handler in root_logger.handlers[:]:
+    if getattr(handler, "_multi_tool_agent", False): # Left over from a previous import of this module
+        root_logger.removeHandler(handler)
+root_logger.addHandler(queue_handler)
+
+_listener = QueueListener(_log_queue, *output_handlers, respect_handler_level=True)
+_listener.start()
+# Stopping the listener drains the queue, so buffered records are written at shutdown
+atexit.register(_listener.stop)
+
+logger.debug("Queued logging initialized for multi_tool_agent logger and root logger.")
+
+
+if orjson is not None:
+    _dumps = orjson.dumps
+    _DUMPS_OPTION = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    _DUMPS_ERROR = orjson.JSONEncodeError
 
 def format_json(obj: Any) -> str:
     """Format an object as a pretty-printed JSON string."""
+    if orjson is not None:
+        try:
+            # Dataclasses are serialized natively; other unknown values fall back to str()
+            return _dumps(obj, default=str, option=_DUMPS_OPTION).decode("utf-8")
+        except _DUMPS_ERROR: # e.g. circular references or oversized integers
+            return str(obj)
     try:
         return json.dumps(obj, indent=2, ensure_ascii=False)
     except TypeError: # Catch specific error for non-serializable objects
         return str(obj)
 
+@functools.lru_cache(maxsize=256)
+def _sid_tag(session_id: Optional[str]) -> str:
+    """The " [Session: ...]" tag for a session id, built once per session."""
+    return f" [Session: {session_id}]" if session_id else ""
+
+class _Lazy:
+    """Defers fn(arg) until the log record's message is actually built by logging."""
+    __slots__ = ("fn", "arg")
+
+    def __init__(self, fn, arg):
+        self.fn = fn
+        self.arg = arg
+
+    def __str__(self) -> str:
+        return self.fn(self.arg)
+
 def log_api_request(endpoint: str, request_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log an API request with formatted data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"API REQUEST{session_info} - {endpoint}")
-    logger.info(f"REQUEST DATA:\n{format_json(request_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("API REQUEST%s - %s\nREQUEST DATA:\n%s", session_info, endpoint, _Lazy(format_json, request_data))
 
 def log_api_response(endpoint: str, response_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log an API response with formatted data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"API RESPONSE{session_info} - {endpoint}")
-    logger.info(f"RESPONSE DATA:\n{format_json(response_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("API RESPONSE%s - %s\nRESPONSE DATA:\n%s", session_info, endpoint, _Lazy(format_json, response_data))
 
 def log_agent_call(agent_name: str, input_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log an agent call with formatted input data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"AGENT CALL{session_info} - {agent_name}")
-    logger.info(f"INPUT DATA:\n{format_json(input_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("AGENT CALL%s - %s\nINPUT DATA:\n%s", session_info, agent_name, _Lazy(format_json, input_data))
 
 def log_agent_response(agent_name: str, output_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log an agent response with formatted output data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"AGENT RESPONSE{session_info} - {agent_name}")
-    logger.info(f"OUTPUT DATA:\n{format_json(output_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("AGENT RESPONSE%s - %s\nOUTPUT DATA:\n%s", session_info, agent_name, _Lazy(format_json, output_data))
 
 def log_tool_call(tool_name: str, input_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log a tool call with formatted input data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"TOOL CALL{session_info} - {tool_name}")
-    logger.info(f"INPUT DATA:\n{format_json(input_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("TOOL CALL%s - %s\nINPUT DATA:\n%s", session_info, tool_name, _Lazy(format_json, input_data))
 
 def log_tool_response(tool_name: str, output_data: Dict[str, Any], session_id: Optional[str] = None) -> None:
     """Log a tool response with formatted output data."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.info(f"TOOL RESPONSE{session_info} - {tool_name}")
-    logger.info(f"OUTPUT DATA:\n{format_json(output_data)}")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    session_info = _sid_tag(session_id)
+    logger.info("TOOL RESPONSE%s - %s\nOUTPUT DATA:\n%s", session_info, tool_name, _Lazy(format_json, output_data))
 
 def log_chat_message(message: str, session_id: Optional[str] = None, is_user: bool = True) -> None:
     """Log a chat message."""
     sender_type = "USER" if is_user else "AGENT"
-    session_info = f" [Session: {session_id}]" if session_id else ""
+    session_info = _sid_tag(session_id)
     logger.info(f"CHAT MESSAGE ({sender_type}){session_info}:\n{str(message)}")
 
-def log_error(context: str, error: Exception, session_id: Optional[str] = None) -> None:
-    """Log an error with context."""
-    session_info = f" [Session: {session_id}]" if session_id else ""
-    logger.error(f"ERROR{session_info} - {context}: {str(error)}", exc_info=True)
\ No newline at end of file
+def log_error(context: str, error: Exception, session_id: Optional[str] = None, exc_info: bool = True) -> None:
+    """
+    Log an error with context, including the traceback unless exc_info is False.
+    Errors that were never raised (e.g. built from an error message) have no traceback
+    to show, so they are logged without exception info.
+    """
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+    raised = isinstance(error, BaseException) and error.__traceback__ is not None
+    logger.error("ERROR%s - %s: %s", _sid_tag(session_id), context, error, exc_info=error if exc_info and raised else False)
\ No newline at end of file
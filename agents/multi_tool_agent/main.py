@@ -6,122 +6,165 @@ for running the various agents and workflows.
 """
 
 import os
+import re
 import sys
-import json
 import argparse
-from typing import Dict, Any, List
+import functools
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from .logger import logger, log_error
 
-from google.adk.agents import Agent
-from google.adk.runners import Runner
-
-# Import our components
-from models import Course, TaskDocument, UserInteractionState
-import agentic_workflow_system as aws
-import document_pipeline as dp
-import tools
-
-# Import enhanced API
-try:
-    from enhanced_api import app as enhanced_api_app
-    ENHANCED_API_AVAILABLE = True
-except ImportError:
-    ENHANCED_API_AVAILABLE = False
-    logger.warning("Enhanced API not available. Install FastAPI and uvicorn to use API mode.")
-
-def setup_argparse() -> argparse.ArgumentParser:
-    """Set up command line argument parsing."""
-    parser = argparse.ArgumentParser(description='Agentic Workflow System for Course Planning and Assessment')
-    
-    subparsers = parser.add_subparsers(dest='command', help='Command to run')
-    
-    # Document pipeline command
-    doc_parser = subparsers.add_parser('document', help='Process a document')
+from . import fast_json
+
+# The agent components (and the ADK runtime they pull in) are imported inside the
+# command handlers that need them, so --help and light commands start fast
+
+# Bloom's keywords in priority order: when an objective contains several, the one listed first wins
+_BLOOM_KEYWORDS = (
+    ("understand", "Understanding"),
+    ("apply", "Application"),
+    ("analyze", "Analysis"),
+    ("create", "Creation"),
+    ("evaluate", "Evaluation"),
+    ("remember", "Remembering")
+)
+# One case-insensitive substring alternation, a group per keyword; a match's lastindex is its priority
+_BLOOM_RE = re.compile("|".join(f"({re.escape(keyword)})" for keyword, _ in _BLOOM_KEYWORDS), re.IGNORECASE)
+_BLOOM_LEVEL_BY_GROUP = (None,) + tuple(level for _, level in _BLOOM_KEYWORDS)
+
+# Memoized: catalogs reuse the same objective wording across courses
+@functools.lru_cache(maxsize=4096)
+def _bloom_level(objective: str, default: str = "Understanding") -> str:
+    best = min((match.lastindex for match in _BLOOM_RE.finditer(objective)), default=None)
+    return _BLOOM_LEVEL_BY_GROUP[best] if best else default
+
+# Arguments for the command handlers when called from interactive mode, without argparse
+@dataclass(slots=True)
+class DocArgs:
+    document_path: str
+    course_name: str
+
+@dataclass(slots=True)
+class PlanArgs:
+    objectives: Optional[str]
+    duration: int
+
+@dataclass(slots=True)
+class AssessArgs:
+    course_id: Optional[str]
+    type: str
+
+def _add_document_args(doc_parser: argparse.ArgumentParser) -> None:
     doc_parser.add_argument('document_path', help='Path to the document to process')
     doc_parser.add_argument('--course-name', help='Name for the course', default='New Course')
-    
-    # Course planning command
-    plan_parser = subparsers.add_parser('plan', help='Plan a course')
+
+def _add_plan_args(plan_parser: argparse.ArgumentParser) -> None:
     plan_parser.add_argument('--objectives', help='Comma-separated list of learning objectives')
     plan_parser.add_argument('--duration', help='Course duration in weeks', type=int, default=12)
-    
-    # Assessment generation command
-    assess_parser = subparsers.add_parser('assessment', help='Generate assessments')
+
+def _add_assessment_args(assess_parser: argparse.ArgumentParser) -> None:
     assess_parser.add_argument('--course-id', help='ID of the course')
     assess_parser.add_argument('--type', help='Type of assessment (quiz, exam, project)', default='quiz')
-    
-    # Interactive mode command
-    interactive_parser = subparsers.add_parser('interactive', help='Start interactive mode')
-    
-    # Test mode command
-    test_parser = subparsers.add_parser('test', help='Run tests')
+
+def _add_test_args(test_parser: argparse.ArgumentParser) -> None:
     test_parser.add_argument('--test-type', help='Type of test to run', choices=['document', 'all'], default='all')
-    
-    # Enhanced API server command
-    api_parser = subparsers.add_parser('api', help='Start enhanced API server')
+
+def _add_api_args(api_parser: argparse.ArgumentParser) -> None:
     api_parser.add_argument('--host', help='Host to bind to', default='0.0.0.0')
     api_parser.add_argument('--port', help='Port to bind to', type=int, default=8000)
     api_parser.add_argument('--reload', help='Enable auto-reload', action='store_true')
     api_parser.add_argument('--log-level', help='Log level', choices=['debug', 'info', 'warning', 'error'], default='info')
+
+# Subcommand name -> (help, argument builder), in the order shown by --help
+SUBCOMMANDS: Dict[str, Tuple[str, Optional[Callable[[argparse.ArgumentParser], None]]]] = {
+    'document': ('Process a document', _add_document_args),
+    'plan': ('Plan a course', _add_plan_args),
+    'assessment': ('Generate assessments', _add_assessment_args),
+    'interactive': ('Start interactive mode', None),
+    'test': ('Run tests', _add_test_args),
+    'api': ('Start enhanced API server', _add_api_args),
+}
+
+# One parser per command plus the full one; the keys are bounded by SUBCOMMANDS
+@functools.lru_cache(maxsize=None)
+def setup_argparse(command: Optional[str] = None) -> argparse.ArgumentParser:
+    """
+    Set up command line argument parsing. When a known command is given, only that
+    subparser is built; otherwise all of them are, for --help and error messages.
+    """
+    parser = argparse.ArgumentParser(description='Agentic Workflow System for Course Planning and Assessment')
+    
+    subparsers = parser.add_subparsers(dest='command', help='Command to run')
+    
+    names = [command] if command in SUBCOMMANDS else list(SUBCOMMANDS)
+    for name in names:
+        help_text, add_args = SUBCOMMANDS[name]
+        subparser = subparsers.add_parser(name, help=help_text)
+        if add_args is not None:
+            add_args(subparser)
     
     return parser
 
 def process_document_command(args: argparse.Namespace) -> None:
     """Handle the document processing command."""
+    from . import document_pipeline as dp
+
     logger.info(f"Processing document: {args.document_path}")
     
     result = dp.process_document(args.document_path)
     
     if result["status"] == "success":
-        logger.info(f"Document processed successfully")
-        logger.info(f"Summary: {result['summary']}")
-        logger.info(f"Objectives ({len(result['objectives'])}):")
-        for i, obj in enumerate(result['objectives']):
-            logger.info(f"  {i+1}. {obj}")
-        
-        logger.info(f"Topics ({len(result['topics'])}):")
-        for i, topic in enumerate(result['topics']):
-            logger.info(f"  {i+1}. {topic}")
-        
-        logger.info(f"Bloom's Levels: {', '.join(result['blooms_levels'])}")
+        # One record per report instead of one per line
+        lines = ["Document processed successfully", f"Summary: {result['summary']}"]
+        lines.append(f"Objectives ({len(result['objectives'])}):")
+        lines.extend(f"  {i+1}. {obj}" for i, obj in enumerate(result['objectives']))
+        lines.append(f"Topics ({len(result['topics'])}):")
+        lines.extend(f"  {i+1}. {topic}" for i, topic in enumerate(result['topics']))
+        lines.append(f"Bloom's Levels: {', '.join(result['blooms_levels'])}")
+        logger.info("\n".join(lines))
         
         # Create a course
         course = dp.create_course_from_document(args.document_path, args.course_name)
         if course:
-            logger.info(f"Created course: {course.name} (ID: {course.course_id})")
+            logger.info(f"Created course: {course.title} (ID: {course.id})")
             
             # Save course to a JSON file for later use
-            course_file = f"course_{course.course_id}.json"
-            with open(course_file, 'w') as f:
-                # Convert dataclass to dict
+            course_file = f"course_{course.id}.json"
+            with open(course_file, 'wb') as f:
                 course_dict = {
-                    "course_id": course.course_id,
-                    "name": course.name,
-                    "summary": course.summary,
+                    "course_id": course.id,
+                    "name": course.title,
+                    "summary": course.description,
                     "objectives": course.objectives,
                     "blooms_levels": course.blooms_levels
                 }
-                json.dump(course_dict, f, indent=2)
+                fast_json.dump(course_dict, f, pretty=True)
                 
             logger.info(f"Course saved to {course_file}")
     else:
         log_error("process_document_command", Exception(result.get('error_message', 'Unknown error')))
 
+DEFAULT_PLAN_OBJECTIVES = (
+    "Understand key pedagogical concepts and theories",
+    "Apply instructional design principles to course planning",
+    "Analyze student needs and learning styles",
+    "Create aligned assessments using Bloom's taxonomy",
+    "Evaluate learning outcomes and iterate on course design"
+)
+
 def plan_course_command(args: argparse.Namespace) -> None:
     """Handle the course planning command."""
+    from . import tools
+
     logger.info("Planning course...")
     
     # Get objectives from args or use defaults
     if args.objectives:
-        objectives = [obj.strip() for obj in args.objectives.split(',')]
+        objectives = tuple(obj.strip() for obj in args.objectives.split(','))
     else:
-        objectives = [
-            "Understand key pedagogical concepts and theories",
-            "Apply instructional design principles to course planning",
-            "Analyze student needs and learning styles",
-            "Create aligned assessments using Bloom's taxonomy",
-            "Evaluate learning outcomes and iterate on course design"
-        ]
+        objectives = DEFAULT_PLAN_OBJECTIVES
     
     logger.info(f"Planning course with {len(objectives)} objectives for {args.duration} weeks")
     
@@ -136,42 +179,49 @@ def plan_course_command(args: argparse.Namespace) -> None:
     
     if result["status"] == "success":
         syllabus = result["syllabus"]
-        logger.info(f"Generated syllabus: {syllabus['title']}")
-        logger.info(f"Modules: {len(syllabus['modules'])}")
-        
+        lines = [f"Generated syllabus: {syllabus['title']}", f"Modules: {len(syllabus['modules'])}"]
         for module in syllabus['modules']:
-            logger.info(f"  Module {module['id']}: {module['title']}")
-            logger.info(f"    Primary objective: {module['primary_objective']}")
-            logger.info(f"    Sessions: {len(module['sessions'])}")
+            lines.append(f"  Module {module['id']}: {module['title']}")
+            lines.append(f"    Primary objective: {module['primary_objective']}")
+            lines.append(f"    Sessions: {len(module['sessions'])}")
+        logger.info("\n".join(lines))
         
         # Save syllabus to a JSON file
         syllabus_file = "syllabus.json"
-        with open(syllabus_file, 'w') as f:
-            json.dump(syllabus, f, indent=2)
+        with open(syllabus_file, 'wb') as f:
+            fast_json.dump(syllabus, f, pretty=True)
             
         logger.info(f"Syllabus saved to {syllabus_file}")
     else:
         log_error("plan_course_command", Exception(result.get('error_message', 'Unknown error')))
 
+def _load_saved_course(course_id: str):
+    """Load a course saved as JSON by the document command, or None if there is no such file."""
+    try:
+        f = open(f"course_{course_id}.json", 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        course_dict = fast_json.loads(f.read())
+    from .models import Course
+    return Course(
+        id=course_dict["course_id"],
+        title=course_dict["name"],
+        description=course_dict["summary"],
+        objectives=course_dict["objectives"],
+        blooms_levels=course_dict["blooms_levels"]
+    )
+
 def generate_assessment_command(args: argparse.Namespace) -> None:
     """Handle the assessment generation command."""
+    from . import tools
+
     logger.info(f"Generating {args.type} assessment...")
     
     # Try to load course from a file if course_id is provided
-    course = None
-    if args.course_id:
-        course_file = f"course_{args.course_id}.json"
-        if os.path.exists(course_file):
-            with open(course_file, 'r') as f:
-                course_dict = json.load(f)
-                course = Course(
-                    course_id=course_dict["course_id"],
-                    name=course_dict["name"],
-                    summary=course_dict["summary"],
-                    objectives=course_dict["objectives"],
-                    blooms_levels=course_dict["blooms_levels"]
-                )
-                logger.info(f"Loaded course: {course.name}")
+    course = _load_saved_course(args.course_id) if args.course_id else None
+    if course:
+        logger.info(f"Loaded course: {course.title}")
     
     # Use default objectives if no course was loaded
     if not course:
@@ -200,23 +250,7 @@ def generate_assessment_command(args: argparse.Namespace) -> None:
         ]
     else:
         # Convert course objectives to the format needed by the quiz generator
-        objectives = []
-        bloom_keywords = {
-            "understand": "Understanding",
-            "apply": "Application",
-            "analyze": "Analysis",
-            "create": "Creation",
-            "evaluate": "Evaluation",
-            "remember": "Remembering"
-        }
-        
-        for obj in course.objectives:
-            obj_lower = obj.lower()
-            level = next((bloom_keywords[kw] for kw in bloom_keywords if kw in obj_lower), "Understanding")
-            objectives.append({
-                "text": obj,
-                "bloom_level": level
-            })
+        objectives = [{"text": obj, "bloom_level": _bloom_level(obj)} for obj in course.objectives]
     
     # Define question counts based on assessment type
     if args.type == "quiz":
@@ -234,93 +268,126 @@ def generate_assessment_command(args: argparse.Namespace) -> None:
     
     if result["status"] == "success":
         quiz = result["quiz"]
-        logger.info(f"Generated {quiz['title']}")
-        logger.info(f"Questions: {quiz['metadata']['question_count']}")
+        lines = [f"Generated {quiz['title']}", f"Questions: {quiz['metadata']['question_count']}"]
         
         # Display a few sample questions
-        logger.info("\nSample questions:")
+        lines.append("\nSample questions:")
         for i, question in enumerate(quiz['questions'][:3]):
-            logger.info(f"  Q{i+1}: {question['text']}")
+            lines.append(f"  Q{i+1}: {question['text']}")
             if question['type'] == 'mcq':
-                for option in question['options']:
-                    logger.info(f"    {option['id']}: {option['text']}")
-                logger.info(f"    Answer: {quiz['answer_key'][question['id']]}")
+                lines.extend(f"    {option['id']}: {option['text']}" for option in question['options'])
+                lines.append(f"    Answer: {quiz['answer_key'][question['id']]}")
+        logger.info("\n".join(lines))
         
         # Save to a file
-        assessment_file = f"{args.type}_{quiz['metadata']['generated_at'].replace(':', '-')}.json"
-        with open(assessment_file, 'w') as f:
-            json.dump(quiz, f, indent=2)
+        assessment_file = f"{args.type}_{quiz['metadata']['file_stamp']}.json"
+        with open(assessment_file, 'wb') as f:
+            fast_json.dump(quiz, f, pretty=True)
             
         logger.info(f"\nAssessment saved to {assessment_file}")
     else:
         log_error("generate_assessment_command", Exception(result.get('error_message', 'Unknown error')))
 
+def _run_doc_test() -> None:
+    from . import document_pipeline as dp
+
+    # Test document pipeline; only this test writes under tests/
+    if not os.path.isdir("tests"):
+        os.makedirs("tests", exist_ok=True)
+    sample_path = os.path.join("tests", "sample_syllabus.txt")
+    dp.create_sample_document(sample_path)
+    
+    result = dp.test_document_pipeline(sample_path, "Test Course")
+    
+    if result["status"] == "success":
+        # Each test reports in one record so concurrent tests don't interleave their lines
+        logger.info("\n".join([
+            "\nTesting document pipeline:",
+            "✅ Document pipeline test passed",
+            f"  Created course: {result['course']['name']}",
+            f"  Objectives: {result['course']['objectives_count']}",
+            f"  Bloom's levels: {', '.join(result['course']['blooms_levels'])}"
+        ]))
+    else:
+        log_error("document_pipeline_test", Exception(result.get('error_message', 'Unknown error')))
+
+def _run_plan_test() -> None:
+    from . import tools
+
+    # Test course planning
+    objectives = [
+        "Understand key concepts",
+        "Apply methods",
+        "Analyze cases"
+    ]
+    
+    schedule_constraints = {
+        "start_date": "2023-09-01",
+        "end_date": "2023-12-15",
+        "holidays": []
+    }
+    
+    result = tools.generate_syllabus(objectives, 3, schedule_constraints)
+    
+    if result["status"] == "success":
+        logger.info("\n".join([
+            "\nTesting course planning:",
+            "✅ Course planning test passed",
+            f"  Generated syllabus with {len(result['syllabus']['modules'])} modules"
+        ]))
+    else:
+        log_error("course_planning_test", Exception(result.get('error_message', 'Unknown error')))
+
+def _run_assess_test() -> None:
+    from . import tools
+
+    # Test assessment generation
+    objectives = [
+        {"text": "Understand key concepts", "bloom_level": "Understanding"},
+        {"text": "Apply methods", "bloom_level": "Application"},
+        {"text": "Analyze cases", "bloom_level": "Analysis"}
+    ]
+    
+    question_counts = {"mcq": 2, "true_false": 1}
+    
+    result = tools.generate_quiz(objectives, question_counts, "easy")
+    
+    if result["status"] == "success":
+        logger.info("\n".join([
+            "\nTesting assessment generation:",
+            "✅ Assessment generation test passed",
+            f"  Generated quiz with {result['quiz']['metadata']['question_count']} questions"
+        ]))
+    else:
+        log_error("assessment_generation_test", Exception(result.get('error_message', 'Unknown error')))
+
 def run_tests(args: argparse.Namespace) -> None:
-    """Run tests for the system."""
+    """Run tests for the system. The selected tests share no state, so they run concurrently."""
     logger.info("Running tests...")
     
+    tests = []
     if args.test_type in ['document', 'all']:
-        # Test document pipeline
-        logger.info("\nTesting document pipeline:")
-        sample_path = os.path.join("tests", "sample_syllabus.txt")
-        dp.create_sample_document(sample_path)
-        
-        result = dp.test_document_pipeline(sample_path, "Test Course")
-        
-        if result["status"] == "success":
-            logger.info("✅ Document pipeline test passed")
-            logger.info(f"  Created course: {result['course']['name']}")
-            logger.info(f"  Objectives: {result['course']['objectives_count']}")
-            logger.info(f"  Bloom's levels: {', '.join(result['course']['blooms_levels'])}")
-        else:
-            log_error("document_pipeline_test", Exception(result.get('error_message', 'Unknown error')))
-    
+        tests.append(_run_doc_test)
     if args.test_type == 'all':
-        # Test course planning
-        logger.info("\nTesting course planning:")
-        objectives = [
-            "Understand key concepts",
-            "Apply methods",
-            "Analyze cases"
-        ]
-        
-        schedule_constraints = {
-            "start_date": "2023-09-01",
-            "end_date": "2023-12-15",
-            "holidays": []
-        }
-        
-        result = tools.generate_syllabus(objectives, 3, schedule_constraints)
-        
-        if result["status"] == "success":
-            logger.info("✅ Course planning test passed")
-            logger.info(f"  Generated syllabus with {len(result['syllabus']['modules'])} modules")
-        else:
-            log_error("course_planning_test", Exception(result.get('error_message', 'Unknown error')))
-        
-        # Test assessment generation
-        logger.info("\nTesting assessment generation:")
-        objectives = [
-            {"text": "Understand key concepts", "bloom_level": "Understanding"},
-            {"text": "Apply methods", "bloom_level": "Application"},
-            {"text": "Analyze cases", "bloom_level": "Analysis"}
-        ]
-        
-        question_counts = {"mcq": 2, "true_false": 1}
-        
-        result = tools.generate_quiz(objectives, question_counts, "easy")
-        
-        if result["status"] == "success":
-            logger.info("✅ Assessment generation test passed")
-            logger.info(f"  Generated quiz with {result['quiz']['metadata']['question_count']} questions")
-        else:
-            log_error("assessment_generation_test", Exception(result.get('error_message', 'Unknown error')))
+        tests.extend([_run_plan_test, _run_assess_test])
+    
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = {executor.submit(test): test.__name__ for test in tests}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                log_error(futures[future], e)
 
 def start_interactive_mode() -> None:
     """Start interactive mode for the system."""
-    logger.info("Starting interactive mode...")
-    logger.info("This would launch a chat interface where users can interact with the agents.")
-    logger.info("For now, this is a placeholder - interactive mode not fully implemented yet.")
+    from . import agentic_workflow_system as aws
+
+    logger.info("\n".join([
+        "Starting interactive mode...",
+        "This would launch a chat interface where users can interact with the agents.",
+        "For now, this is a placeholder - interactive mode not fully implemented yet."
+    ]))
     
     # Initialize a session
     user_id = "interactive_user"
@@ -328,64 +395,110 @@ def start_interactive_mode() -> None:
     logger.info(f"Created session {session_id}")
     
     # This would normally launch a real interactive interface
-    # For now, just show a simple menu
+    # For now, just show a simple menu; a full command line is also accepted
+    menu = "\n".join([
+        "\nWhat would you like to do?",
+        "1. Process a document",
+        "2. Plan a course",
+        "3. Generate an assessment",
+        "4. Exit",
+        "Or type a command, e.g. document notes.txt --course-name Biology"
+    ])
     while True:
-        logger.info("\nWhat would you like to do?")
-        logger.info("1. Process a document")
-        logger.info("2. Plan a course")
-        logger.info("3. Generate an assessment")
-        logger.info("4. Exit")
+        logger.info(menu)
         
-        choice = input("Enter your choice (1-4): ")
+        line = input("Enter your choice (1-4) or a command: ").strip()
         
-        if choice == "1":
-            doc_path = input("Enter document path: ")
-            course_name = input("Enter course name: ")
-            process_document_command(argparse.Namespace(document_path=doc_path, course_name=course_name))
-        elif choice == "2":
-            objectives = input("Enter objectives (comma-separated) or leave blank for defaults: ")
-            duration = input("Enter duration in weeks (default: 12): ")
-            
-            try:
-                duration = int(duration) if duration else 12
-            except ValueError:
-                duration = 12
-                
-            plan_course_command(argparse.Namespace(objectives=objectives, duration=duration))
-        elif choice == "3":
-            course_id = input("Enter course ID (optional): ")
-            assessment_type = input("Enter assessment type (quiz, exam, project) default=quiz: ")
-            
-            if not assessment_type:
-                assessment_type = "quiz"
-                
-            generate_assessment_command(argparse.Namespace(
-                course_id=course_id if course_id else None,
-                type=assessment_type
-            ))
-        elif choice == "4":
+        if line == "4":
             logger.info("Exiting interactive mode")
             break
-        else:
+        prompt = _MENU_PROMPTS.get(line)
+        if prompt is not None:
+            prompt()
+        elif not _run_command_line(line):
             logger.info("Invalid choice, please try again")
 
+def _prompt_document() -> None:
+    doc_path = input("Enter document path: ")
+    course_name = input("Enter course name: ")
+    process_document_command(DocArgs(document_path=doc_path, course_name=course_name))
+
+def _prompt_plan() -> None:
+    objectives = input("Enter objectives (comma-separated) or leave blank for defaults: ")
+    duration = input("Enter duration in weeks (default: 12): ")
+    
+    try:
+        duration = int(duration) if duration else 12
+    except ValueError:
+        duration = 12
+        
+    plan_course_command(PlanArgs(objectives=objectives, duration=duration))
+
+def _prompt_assessment() -> None:
+    course_id = input("Enter course ID (optional): ")
+    assessment_type = input("Enter assessment type (quiz, exam, project) default=quiz: ")
+    
+    if not assessment_type:
+        assessment_type = "quiz"
+        
+    generate_assessment_command(AssessArgs(
+        course_id=course_id if course_id else None,
+        type=assessment_type
+    ))
+
+_MENU_PROMPTS: Dict[str, Callable[[], None]] = {
+    "1": _prompt_document,
+    "2": _prompt_plan,
+    "3": _prompt_assessment,
+}
+
+# Commands that can be typed directly at the interactive prompt
+_INTERACTIVE_COMMANDS = ('document', 'plan', 'assessment')
+
+def _run_command_line(line: str) -> bool:
+    """Parse one interactive line with the cached CLI parser and run it; False if it is not a command."""
+    try:
+        tokens = shlex.split(line)
+    except ValueError:
+        return False
+    if not tokens or tokens[0] not in _INTERACTIVE_COMMANDS:
+        return False
+    try:
+        args = setup_argparse().parse_args(tokens)
+    except SystemExit:
+        # argparse has already printed the usage error
+        return True
+    COMMANDS[args.command](args)
+    return True
+
+@functools.lru_cache(maxsize=1)
+def enhanced_api_available() -> bool:
+    """Whether the enhanced API (and the FastAPI/ADK stack it imports) can be loaded; checked on first use."""
+    try:
+        from .enhanced_api import app as enhanced_api_app  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 def start_enhanced_api_server(args: argparse.Namespace) -> None:
     """Start the enhanced API server."""
-    if not ENHANCED_API_AVAILABLE:
+    if not enhanced_api_available():
         logger.error("Enhanced API not available. Please install FastAPI and uvicorn:")
         logger.error("pip install fastapi uvicorn")
         sys.exit(1)
     
-    logger.info("Starting Enhanced Pedagogical Agent API Server...")
-    logger.info(f"Host: {args.host}")
-    logger.info(f"Port: {args.port}")
-    logger.info(f"Reload: {args.reload}")
-    logger.info(f"Log Level: {args.log_level}")
+    logger.info("\n".join([
+        "Starting Enhanced Pedagogical Agent API Server...",
+        f"Host: {args.host}",
+        f"Port: {args.port}",
+        f"Reload: {args.reload}",
+        f"Log Level: {args.log_level}"
+    ]))
     
     try:
         import uvicorn
         uvicorn.run(
-            "enhanced_api:app",
+            f"{__package__}.enhanced_api:app",
             host=args.host,
             port=args.port,
             reload=args.reload,
@@ -399,29 +512,27 @@ def start_enhanced_api_server(args: argparse.Namespace) -> None:
         logger.error(f"Failed to start API server: {e}")
         sys.exit(1)
 
+COMMANDS: Dict[str, Callable[[argparse.Namespace], None]] = {
+    'document': process_document_command,
+    'plan': plan_course_command,
+    'assessment': generate_assessment_command,
+    'test': run_tests,
+    'interactive': lambda args: start_interactive_mode(),
+    'api': start_enhanced_api_server,
+}
+
 def main() -> None:
     """Main entry point for the application."""
-    parser = setup_argparse()
+    requested = sys.argv[1] if len(sys.argv) > 1 else None
+    parser = setup_argparse(requested if requested in SUBCOMMANDS else None)
     args = parser.parse_args()
     
-    # Create the tests directory if it doesn't exist
-    os.makedirs("tests", exist_ok=True)
-    
-    if args.command == 'document':
-        process_document_command(args)
-    elif args.command == 'plan':
-        plan_course_command(args)
-    elif args.command == 'assessment':
-        generate_assessment_command(args)
-    elif args.command == 'test':
-        run_tests(args)
-    elif args.command == 'interactive':
-        start_interactive_mode()
-    elif args.command == 'api':
-        start_enhanced_api_server(args)
-    else:
+    command = COMMANDS.get(args.command)
+    if command is None:
         # No command specified, show help
         parser.print_help()
+        return
+    command(args)
         
 if __name__ == "__main__":
     main() 
\ No newline at end of file
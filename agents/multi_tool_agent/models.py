@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class Course:
     id: str
     title: str
@@ -9,12 +9,13 @@ class Course:
     level: Optional[str] = None
     documents: Optional[List[Dict]] = field(default_factory=list) # Assuming documents are a list of dicts for now
     course_details_json: Optional[Dict[str, Any]] = None # New field for JSON course details
-    course_details_json: Optional[Dict[str, Any]] = None # New field for JSON course details
     session: Optional[str] = None
     instructor: Optional[str] = None
     summarized_pedagogical_info: Optional[str] = None
+    objectives: List[str] = field(default_factory=list) # Filled by the document pipeline
+    blooms_levels: List[str] = field(default_factory=list) # One per objective
 
-@dataclass
+@dataclass(slots=True)
 class UserProfile:
     userId: str
     name: Optional[str] = None
@@ -22,7 +23,7 @@ class UserProfile:
     preferences: Optional[Dict[str, Any]] = field(default_factory=dict)
     courses: List[Course] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class TaskDocument:
     doc_id: str
     course_id: str
@@ -31,7 +32,7 @@ class TaskDocument:
     objectives: List[str]
     blooms_levels: List[str]
 
-@dataclass
+@dataclass(slots=True)
 class UserInteractionState:
     user_id: str
     current_course: Optional[Course] = None # Store the full Course object
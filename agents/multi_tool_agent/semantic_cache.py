@@ -0,0 +1,175 @@
+"""
+Semantic response cache for deterministic-in-intent tools.
+Serves repeated or near-identical tool inputs from memory instead of recomputing them.
+"""
+
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from .logger import log_error
+
+EmbeddingFunction = Callable[[str], Sequence[float]]
+
+def _normalize_vector(vector: Sequence[float]) -> Tuple[float, ...]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return tuple(v / norm for v in vector)
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+class SemanticCache:
+    """
+    LRU cache with TTL and an optional embedding-similarity tier.
+
+    Entries are keyed by an exact-match key. When an embedding function is configured,
+    a miss on the exact key falls back to the most similar entry that shares the same
+    exact-match portion, accepted only above the similarity threshold.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 86400,
+        maxsize: int = 1024,
+        embed_fn: Optional[EmbeddingFunction] = None
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.embed_fn = embed_fn
+        # key -> (created_at, bucket, embedding, value)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Tuple, Optional[Tuple[float, ...]], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, text: Optional[str]) -> Optional[Tuple[float, ...]]:
+        if self.embed_fn is None or text is None:
+            return None
+        try:
+            return _normalize_vector(self.embed_fn(text))
+        except Exception as e:
+            log_error("SemanticCache.embed", e)
+            return None
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: Tuple, bucket: Tuple = (), text: Optional[str] = None) -> Tuple[bool, Any]:
+        """Return (hit, value) for an exact key, falling back to a similarity match within the bucket."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_expired(entry[0], now):
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, copy.deepcopy(entry[3])
+
+        query = self._embed(text)
+        if query is not None:
+            with self._lock:
+                best_key, best_score = None, self.threshold
+                for candidate_key, (created_at, candidate_bucket, embedding, _) in self._entries.items():
+                    if candidate_bucket != bucket or embedding is None or self._is_expired(created_at, now):
+                        continue
+                    score = _dot(query, embedding)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    return True, copy.deepcopy(self._entries[best_key][3])
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def set(self, key: Tuple, value: Any, bucket: Tuple = (), text: Optional[str] = None) -> None:
+        """Store a value under an exact key, evicting the least recently used entry when full."""
+        embedding = self._embed(text)
+        with self._lock:
+            self._entries[key] = (time.time(), bucket, embedding, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def text_digest(text: str) -> str:
+    """Stable digest of the exact text, used as the exact-match key for (possibly long) inputs."""
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest()
+
+def _normalized_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+def semantic_cache(
+    ttl: float = 86400,
+    embed_arg: Optional[str] = None,
+    maxsize: int = 1024,
+    cache: Optional[SemanticCache] = None
+) -> Callable:
+    """
+    Cache a tool's successful results keyed by (function name, inputs).
+
+    All arguments except ``embed_arg`` form the exact-match portion of the key. The
+    ``embed_arg`` value is keyed by the digest of its exact text, so whole documents can be
+    cached without being held in the key (tools echo it back, so it is not normalized).
+    Only a ``cache`` built with an embedding function also matches it by similarity.
+    """
+    def decorator(func: Callable) -> Callable:
+        store = cache or SemanticCache(ttl=ttl, maxsize=maxsize)
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            text = arguments.pop(embed_arg, None) if embed_arg else None
+            bucket = (func.__name__, _normalized_json(arguments))
+            key = bucket + ((text_digest(text),) if text is not None else ())
+            return key, bucket, text
+
+        def remember(key, bucket, text, result):
+            if isinstance(result, dict) and result.get("status") == "success":
+                store.set(key, result, bucket, text)
+            return result
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key, bucket, text = make_key(args, kwargs)
+                hit, value = store.get(key, bucket, text)
+                if hit:
+                    return value
+                return remember(key, bucket, text, await func(*args, **kwargs))
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key, bucket, text = make_key(args, kwargs)
+                hit, value = store.get(key, bucket, text)
+                if hit:
+                    return value
+                return remember(key, bucket, text, func(*args, **kwargs))
+
+        wrapper.cache = store
+        return wrapper
+
+    return decorator
@@ -6,6 +6,9 @@ import json
 from typing import Dict, Any, Optional
 
 class Course:
+    __slots__ = ("id", "title", "description", "level", "session", "instructor",
+                 "course_details_json", "_cds_json_str")
+
     def __init__(self, id: str, title: str, description: str, level: str = None, 
                  session: str = None, instructor: str = None, course_details_json: Dict = None):
         self.id = id
@@ -15,6 +18,11 @@ class Course:
         self.session = session
         self.instructor = instructor
         self.course_details_json = course_details_json
+        # Pretty-printed once here rather than on every context build
+        try:
+            self._cds_json_str = json.dumps(course_details_json, indent=2) if course_details_json else None
+        except (TypeError, ValueError):
+            self._cds_json_str = None
 
 def build_consolidated_context_string(
     user_query: str, 
@@ -58,7 +66,11 @@ def build_consolidated_context_string(
     if course_details_json:
         context_parts.append("--- DETAILED COURSE INFORMATION (JSON) ---")
         try:
-            formatted_json = json.dumps(course_details_json, indent=2)
+            if current_course is not None and course_details_json is current_course.course_details_json \
+                    and current_course._cds_json_str is not None:
+                formatted_json = current_course._cds_json_str
+            else:
+                formatted_json = json.dumps(course_details_json, indent=2)
             context_parts.append(formatted_json)
         except Exception:
             context_parts.append(str(course_details_json))
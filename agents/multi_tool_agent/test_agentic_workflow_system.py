@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from multi_tool_agent import agentic_workflow_system as aws
+    from google.adk.events import Event, EventActions
+except ImportError as e:
+    raise unittest.SkipTest(f"agentic_workflow_system requires the Google ADK environment: {e}")
+
+class TestUserHistoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = aws.UserHistoryIndex()
+        self.index.add("U1", "course:U1:C1", {"user_id": "U1", "content": "Course: Linear Algebra matrices"})
+        self.index.add("U1", "course:U1:C2", {"user_id": "U1", "content": "Course: Organic Chemistry"})
+
+    def test_search_ranks_by_query_terms(self):
+        results = self.index.search("U1", "matrices")
+        self.assertEqual([r["content"] for r in results], ["Course: Linear Algebra matrices"])
+
+    def test_search_without_query_returns_most_recent_first(self):
+        results = self.index.search("U1", "", top_k=1)
+        self.assertEqual(results[0]["content"], "Course: Organic Chemistry")
+
+    def test_rewrite_replaces_entry(self):
+        self.index.add("U1", "course:U1:C1", {"user_id": "U1", "content": "Course: Statistics"})
+        self.assertEqual(self.index.search("U1", "matrices"), [])
+        self.assertEqual(len(self.index.search("U1", "statistics")), 1)
+
+    def test_users_are_separate(self):
+        self.assertTrue(self.index.has_user("U1"))
+        self.assertFalse(self.index.has_user("U2"))
+        self.assertEqual(self.index.search("U2", "matrices"), [])
+
+    def test_all_memory_writes_are_searchable(self):
+        course = aws.Course(id="C1", title="Linear Algebra", description="Matrices")
+        with mock.patch.object(aws, "memory_service"), \
+                mock.patch.object(aws, "user_history_index", self.index), \
+                mock.patch.dict(aws._memory_write_digests, clear=True):
+            aws.add_course_to_memory("U3", course)
+            aws._write_memory_entries([{"user_id": "U3", "content": "note: prefers visual examples"}])
+            results = aws.search_user_history("U3")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["content"], "note: prefers visual examples")
+
+class TestBoundedInMemorySessionService(unittest.TestCase):
+    def _append(self, service, session, n):
+        for i in range(n):
+            service.append_event(session, Event(
+                invocation_id=f"inv_{i}",
+                author="system",
+                actions=EventActions(state_delta={"step": i}),
+                timestamp=time.time()
+            ))
+
+    def test_trims_events_past_the_slack(self):
+        service = aws.BoundedInMemorySessionService(max_events=4, trim_slack=2)
+        session = service.create_session(app_name="test", user_id="U1", state={})
+        with mock.patch.object(aws, "_archive_session_events") as archive:
+            self._append(service, session, 6)
+            self.assertEqual(len(session.events), 6)
+            archive.assert_not_called()
+
+            self._append(service, session, 1)
+            self.assertEqual(len(session.events), 4)
+            # Archived once even though the service keeps its own copy of the session
+            archive.assert_called_once()
+            self.assertEqual(len(archive.call_args[0][1]), 3)
+            stored = service.get_session(app_name="test", user_id="U1", session_id=session.id)
+            self.assertEqual(len(stored.events), 4)
+
+    def test_state_survives_trimming(self):
+        service = aws.BoundedInMemorySessionService(max_events=2, trim_slack=0)
+        session = service.create_session(app_name="test", user_id="U1", state={})
+        with mock.patch.object(aws, "_archive_session_events"):
+            self._append(service, session, 5)
+        self.assertEqual(session.state["step"], 4)
+        stored = service.get_session(app_name="test", user_id="U1", session_id=session.id)
+        self.assertEqual(stored.state["step"], 4)
+        self.assertLessEqual(len(stored.events), 2)
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_submits_share_a_batch(self):
+        batches = []
+
+        def process_batch(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        async def run():
+            batcher = aws.MicroBatcher(process_batch, "test", window=0.05, max_batch=8)
+            try:
+                return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+            finally:
+                await batcher.stop()
+
+        self.assertEqual(asyncio.run(run()), [0, 10, 20, 30, 40])
+        self.assertEqual(batches, [[0, 1, 2, 3, 4]])
+
+    def test_max_batch_splits_batches(self):
+        batches = []
+
+        def process_batch(items):
+            batches.append(list(items))
+            return list(items)
+
+        async def run():
+            batcher = aws.MicroBatcher(process_batch, "test", window=0.05, max_batch=2)
+            try:
+                return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+            finally:
+                await batcher.stop()
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2, 3, 4])
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+    def test_batch_error_reaches_every_caller(self):
+        def process_batch(items):
+            raise ValueError("search failed")
+
+        async def run():
+            batcher = aws.MicroBatcher(process_batch, "test", window=0.01)
+            try:
+                return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+            finally:
+                await batcher.stop()
+
+        with mock.patch.object(aws, "log_error"):
+            results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from multi_tool_agent.api import SessionStateStore
+    from multi_tool_agent.models import UserInteractionState
+except ImportError as e:
+    raise unittest.SkipTest(f"api.py requires the FastAPI and Google ADK environment: {e}")
+
+class TestSessionStateStore(unittest.TestCase):
+    def test_set_and_get(self):
+        store = SessionStateStore()
+        state = UserInteractionState(user_id="U1")
+        store["S1"] = state
+        self.assertIs(store["S1"], state)
+        self.assertIn("S1", store)
+        self.assertIsNone(store.get("missing"))
+        self.assertIsNone(store.get(None))
+        with self.assertRaises(KeyError):
+            store["missing"]
+
+    def test_lru_eviction(self):
+        store = SessionStateStore(maxsize=2)
+        store["S1"] = UserInteractionState(user_id="U1")
+        store["S2"] = UserInteractionState(user_id="U2")
+        store.get("S1")  # "S2" is now the least recently used
+        store["S3"] = UserInteractionState(user_id="U3")
+        self.assertEqual(len(store), 2)
+        self.assertIn("S1", store)
+        self.assertNotIn("S2", store)
+        self.assertIn("S3", store)
+
+    def test_ttl_expiry(self):
+        store = SessionStateStore(ttl=0.01)
+        store["S1"] = UserInteractionState(user_id="U1")
+        time.sleep(0.02)
+        self.assertNotIn("S1", store)
+        self.assertEqual(len(store), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from multi_tool_agent import document_pipeline as dp
+    from multi_tool_agent.semantic_cache import SemanticCache
+except ImportError as e:
+    raise unittest.SkipTest(f"document_pipeline requires the Google ADK environment: {e}")
+
+class TestPipelineCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_same_document_is_analyzed_once(self):
+        first = dp.create_sample_document(os.path.join(self.tmpdir, "first.txt"))
+        second = os.path.join(self.tmpdir, "second.txt")
+        shutil.copyfile(first, second)
+
+        with mock.patch.object(dp, "_pipeline_cache", SemanticCache(maxsize=4)), \
+                mock.patch.object(dp, "_analyze_content", wraps=dp._analyze_content) as analyze:
+            result1 = dp.process_document(first)
+            result2 = dp.process_document(second)
+
+        self.assertEqual(analyze.call_count, 1)
+        self.assertEqual(result1["status"], "success")
+        self.assertEqual(result1["summary"], result2["summary"])
+        self.assertEqual(result1["topics"], result2["topics"])
+        # Per-file fields are not taken from the cached analysis
+        self.assertEqual(result1["document_path"], first)
+        self.assertEqual(result2["document_path"], second)
+
+class TestScoreTopics(unittest.TestCase):
+    def test_ranks_matching_topics(self):
+        content = (
+            "Formative assessment and summative assessment methods. "
+            "Assessment design relies on clear learning outcomes."
+        )
+        # Rarer candidate terms (formative, summative) outrank the shared "assessment";
+        # ties keep candidate order, and topics missing a term are left out
+        self.assertEqual(dp.score_topics(content), [
+            "Formative Assessment",
+            "Summative Assessment",
+            "Assessment Methods",
+            "Assessment Design",
+            "Learning Outcomes"
+        ])
+
+    def test_plural_folding(self):
+        self.assertIn("Learning Theory", dp.score_topics("Theories of learning"))
+
+    def test_limit(self):
+        content = " ".join(dp.CANDIDATE_TOPICS)
+        self.assertEqual(len(dp.score_topics(content, limit=3)), 3)
+
+    def test_no_match_falls_back_to_placeholders(self):
+        self.assertEqual(dp.score_topics("Photosynthesis in plants"), [])
+        self.assertEqual(dp.extract_topics("Photosynthesis in plants")["topics"], dp._PLACEHOLDER_TOPICS)
+
+class TestIdentifyBloomLevels(unittest.TestCase):
+    def _levels(self, *objectives):
+        return dp.identify_bloom_levels(list(objectives))["bloom_mapping"]
+
+    def test_keyword_priority_beats_position(self):
+        mapping = self._levels("Evaluate and apply models", "Design and analyze a study")
+        self.assertEqual(mapping["Evaluate and apply models"], "Application")
+        self.assertEqual(mapping["Design and analyze a study"], "Analysis")
+
+    def test_substring_and_case_insensitive(self):
+        mapping = self._levels("Misunderstandings are common", "REDESIGN the unit")
+        self.assertEqual(mapping["Misunderstandings are common"], "Understanding")
+        self.assertEqual(mapping["REDESIGN the unit"], "Creation")
+
+    def test_default_level(self):
+        self.assertEqual(self._levels("List the steps"), {"List the steps": "Understanding"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from multi_tool_agent.main import _bloom_level
+except ImportError as e:
+    raise unittest.SkipTest(f"multi_tool_agent requires the Google ADK environment: {e}")
+
+class TestBloomLevel(unittest.TestCase):
+    def test_single_keyword(self):
+        self.assertEqual(_bloom_level("Evaluate learning outcomes"), "Evaluation")
+        self.assertEqual(_bloom_level("Remember the key dates"), "Remembering")
+
+    def test_keyword_priority_beats_position(self):
+        self.assertEqual(_bloom_level("Apply and understand vectors"), "Understanding")
+        self.assertEqual(_bloom_level("Remember and apply facts"), "Application")
+
+    def test_substring_and_case_insensitive(self):
+        self.assertEqual(_bloom_level("Recreate experiments"), "Creation")
+        self.assertEqual(_bloom_level("ANALYZE the data"), "Analysis")
+
+    def test_default(self):
+        self.assertEqual(_bloom_level("Analyzing data"), "Understanding")
+        self.assertEqual(_bloom_level("List the steps", default="Remembering"), "Remembering")
+
+if __name__ == "__main__":
+    unittest.main()
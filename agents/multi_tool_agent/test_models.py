@@ -4,13 +4,13 @@ from models import Course, TaskDocument, UserInteractionState
 class TestModels(unittest.TestCase):
     def test_course(self):
         course = Course(
-            course_id="C1",
-            name="Linear Algebra",
-            summary="Intro to linear algebra.",
+            id="C1",
+            title="Linear Algebra",
+            description="Intro to linear algebra.",
             objectives=["Understand matrices", "Apply vector spaces"],
             blooms_levels=["Understand", "Apply"]
         )
-        self.assertEqual(course.name, "Linear Algebra")
+        self.assertEqual(course.title, "Linear Algebra")
         self.assertIn("Apply", course.blooms_levels)
 
     def test_task_document(self):
@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import unittest
+
+# The cache module uses package-relative imports, so import it through the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_tool_agent.semantic_cache import SemanticCache, semantic_cache
+
+class TestSemanticCache(unittest.TestCase):
+    def test_hit_returns_a_copy(self):
+        cache = SemanticCache()
+        cache.set(("k",), {"items": [1]})
+        hit, value = cache.get(("k",))
+        self.assertTrue(hit)
+        value["items"].append(2)
+        self.assertEqual(cache.get(("k",))[1], {"items": [1]})
+
+    def test_ttl_expiry(self):
+        cache = SemanticCache(ttl=0.01)
+        cache.set(("k",), "value")
+        time.sleep(0.02)
+        self.assertEqual(cache.get(("k",)), (False, None))
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = SemanticCache(maxsize=2)
+        cache.set(("a",), 1)
+        cache.set(("b",), 2)
+        cache.get(("a",))  # "b" is now the least recently used
+        cache.set(("c",), 3)
+        self.assertTrue(cache.get(("a",))[0])
+        self.assertFalse(cache.get(("b",))[0])
+        self.assertTrue(cache.get(("c",))[0])
+
+    def test_error_results_not_cached(self):
+        calls = []
+
+        @semantic_cache()
+        def tool(x):
+            calls.append(x)
+            return {"status": "error", "error_message": "failed"} if x < 0 else {"status": "success", "value": x}
+
+        tool(-1)
+        tool(-1)
+        self.assertEqual(calls, [-1, -1])
+        self.assertEqual(len(tool.cache), 0)
+        tool(1)
+        tool(1)
+        self.assertEqual(calls, [-1, -1, 1])
+
+    def test_embed_arg_keyed_on_exact_text(self):
+        calls = []
+
+        @semantic_cache(embed_arg="topic")
+        def tool(topic):
+            calls.append(topic)
+            return {"status": "success", "topic": topic}
+
+        self.assertEqual(tool("Cell Biology")["topic"], "Cell Biology")
+        self.assertEqual(tool("cell   biology")["topic"], "cell   biology")
+        self.assertEqual(tool("Cell Biology")["topic"], "Cell Biology")
+        self.assertEqual(calls, ["Cell Biology", "cell   biology"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from .logger import log_tool_call, log_tool_response, log_error
+from .semantic_cache import semantic_cache
 
 # ------------------------------------------------------------------------
 # Document Processing Tools
@@ -93,6 +94,18 @@ def generate_syllabus(
     Returns:
         Dictionary with the generated syllabus
     """
+    result = _generate_syllabus(objectives, module_count, schedule_constraints)
+    # Stamped after the cache lookup so a cached syllabus still reports when it was served
+    if result.get("status") == "success":
+        result["syllabus"]["metadata"]["generated_at"] = datetime.now().isoformat()
+    return result
+
+@semantic_cache()
+def _generate_syllabus(
+    objectives: List[str], 
+    module_count: int, 
+    schedule_constraints: Dict[str, Any]
+) -> Dict[str, Any]:
     log_tool_call("generate_syllabus", {
         "objectives_count": len(objectives),
         "module_count": module_count,
@@ -158,7 +171,6 @@ def generate_syllabus(
         
         # Add course metadata
         syllabus["metadata"] = {
-            "generated_at": datetime.now().isoformat(),
             "start_date": start_date,
             "end_date": schedule_constraints.get("end_date", "2023-12-15"),
             "total_weeks": module_count * weeks_per_module,
@@ -283,6 +295,22 @@ def generate_quiz(
     Returns:
         Dictionary with the generated quiz
     """
+    result = _generate_quiz(objectives, question_counts, difficulty)
+    # Stamped after the cache lookup so every quiz gets its own timestamp and file name
+    if result.get("status") == "success":
+        generated_at = datetime.now()
+        result["quiz"]["metadata"].update({
+            "generated_at": generated_at.isoformat(),
+            "file_stamp": generated_at.strftime("%Y-%m-%dT%H-%M-%S.%f"),  # Filename-safe, no ':'
+        })
+    return result
+
+@semantic_cache()
+def _generate_quiz(
+    objectives: List[Dict[str, Any]], 
+    question_counts: Dict[str, int],
+    difficulty: str = "medium"
+) -> Dict[str, Any]:
     log_tool_call("generate_quiz", {
         "objectives_count": len(objectives),
         "question_counts": question_counts,
@@ -372,7 +400,6 @@ def generate_quiz(
         
         # Add metadata
         quiz["metadata"] = {
-            "generated_at": datetime.now().isoformat(),
             "question_count": question_id - 1,
             "objectives_covered": len(objectives),
             "difficulty": difficulty